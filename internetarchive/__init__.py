@@ -25,6 +25,8 @@ __copyright__ = 'Copyright 2013 Jacob M. Johnson'
 from .item import Item, File
 from .search import Search
 from .catalog import Catalog
+from .session import ArchiveSession, get_default_session
+from .journal import UploadJournal
 from .api import *
 
 
@@ -0,0 +1,200 @@
+"""An asyncio based alternative to :class:`internetarchive.mine.Mine`,
+for retrieving item metadata from within an existing event loop. Unlike
+``internetarchive.mine``, it does not require gevent or monkey-patch
+anything. Requires Python 3.6 or later.
+
+"""
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from . import session
+from .item import Item
+from .retry import RetryPolicy
+
+
+log = logging.getLogger(__name__)
+
+
+# AsyncMine class
+#_________________________________________________________________________________________
+class AsyncMine(object):
+    """This class is for concurrently retrieving metadata for items on
+    Archive.org from asyncio code.
+
+    Requests are made by the shared, pooled requests session on a thread
+    pool, so at most ``workers`` requests are in flight at a time.
+
+    Usage::
+
+        >>> from internetarchive.aiomine import AsyncMine
+        >>> async def main():
+        ...     async for i, metadata in AsyncMine(['nasa', 'stairs'], workers=50):
+        ...         print(i, metadata['metadata']['title'])
+
+    Breaking out of the loop, or cancelling the task iterating over the
+    miner, cancels every pending request. Requests already sent finish in
+    the background, their results are discarded.
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, identifiers, workers=20, max_requests=10, config=None,
+                 archive_session=None, executor=None, retry_policy=None):
+        """
+        :type identifiers: iterable
+        :param identifiers: The identifiers to get the metadata of.
+
+        :type workers: int
+        :param workers: (optional) The maximum number of concurrent
+                        requests.
+
+        :type max_requests: int or None
+        :param max_requests: (optional) The number of times to try fetching
+                             an item's metadata after connection errors
+                             and HTTP errors, with exponential backoff.
+                             ``None`` retries forever. Ignored if
+                             ``retry_policy`` is given.
+
+        :type config: dict
+        :param config: (optional) Configuration options for session.
+
+        :type archive_session: :class:`ArchiveSession <ArchiveSession>`
+        :param archive_session: (optional) The session shared by every
+                                request. Defaults to a new session whose
+                                connection pool is sized to ``workers``.
+
+        :type executor: :class:`concurrent.futures.Executor`
+        :param executor: (optional) The executor to make requests on.
+                         Defaults to a thread pool of ``workers`` threads.
+
+        :type retry_policy: :class:`RetryPolicy <RetryPolicy>`
+        :param retry_policy: (optional) Which errors are retried, and with
+                             which delay.
+
+        """
+        if archive_session is None:
+            archive_session = session.get_session(config, pool_maxsize=workers)
+        self.session = archive_session
+        self.identifiers = identifiers
+        self.workers = workers
+        self.max_requests = max_requests
+        if retry_policy is None:
+            retry_policy = RetryPolicy(max_requests=max_requests)
+        self.retry_policy = retry_policy
+        self.executor = executor
+        self.skips = []
+        self.got_count = 0
+        self.start_time = None
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'AsyncMine(workers={0!r}, got_count={1!r}, skips={2!r})'.format(
+            self.workers, self.got_count, len(self.skips))
+
+    # items_per_second
+    #_____________________________________________________________________________________
+    @property
+    def items_per_second(self):
+        """The number of items returned per second since iteration
+        started."""
+        if not self.start_time:
+            return 0.0
+        return self.got_count / max(time.time() - self.start_time, 1e-6)
+
+    # _get_metadata()
+    #_____________________________________________________________________________________
+    def _get_metadata(self, identifier):
+        item = Item(identifier, archive_session=self.session, lazy=True)
+        return item.get_metadata()
+
+    # _fetch()
+    #_____________________________________________________________________________________
+    async def _fetch(self, loop, executor, semaphore, identifier):
+        num_requests = 0
+        while True:
+            num_requests += 1
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(executor, self._get_metadata,
+                                                      identifier)
+                except Exception as e:
+                    if not self.retry_policy.should_retry(e, num_requests):
+                        raise
+                    error = e
+            # Back off outside of the semaphore, so other items are fetched
+            # in the meantime.
+            delay = self.retry_policy.get_delay(error, num_requests)
+            log.warning('error fetching {0!r} ({1}), retrying in {2:.1f}s'.format(
+                identifier, error, delay))
+            await asyncio.sleep(delay)
+
+    # _result()
+    #_____________________________________________________________________________________
+    def _result(self, identifier, task):
+        try:
+            metadata = task.result()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if identifier not in self.skips:
+                self.skips.append(identifier)
+            log.error('error processing id {0!r}, {1}'.format(identifier, e))
+            return None
+        self.got_count += 1
+        return metadata
+
+    # __aiter__()
+    #_____________________________________________________________________________________
+    def __aiter__(self):
+        return self.iter_metadata()
+
+    # iter_metadata()
+    #_____________________________________________________________________________________
+    async def iter_metadata(self):
+        """Asynchronous generator yielding ``(index, metadata)`` tuples,
+        where ``metadata`` is the Metadata API response for the identifier
+        at ``index``, in the order the responses arrive. Identifiers that
+        fail are recorded in ``skips``.
+
+        """
+        loop = asyncio.get_event_loop()
+        executor = self.executor
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+        semaphore = asyncio.Semaphore(self.workers)
+        self.got_count = 0
+        self.start_time = time.time()
+
+        # Only as many identifiers as can be fetched at once, plus those
+        # waiting to be retried, are read ahead of the results.
+        pending = {}
+        try:
+            for i, identifier in enumerate(self.identifiers):
+                while len(pending) >= self.workers * 2:
+                    done, not_done = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        index, ident = pending.pop(task)
+                        metadata = self._result(ident, task)
+                        if metadata is not None:
+                            yield (index, metadata)
+                task = asyncio.ensure_future(
+                    self._fetch(loop, executor, semaphore, identifier))
+                pending[task] = (i, identifier)
+            while pending:
+                done, not_done = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, ident = pending.pop(task)
+                    metadata = self._result(ident, task)
+                    if metadata is not None:
+                        yield (index, metadata)
+        finally:
+            for task in pending:
+                task.cancel()
+            if own_executor:
+                executor.shutdown(wait=False)
@@ -1,24 +1,26 @@
 from sys import stdout
 
 from . import item, search, catalog
+from .item import DownloadResults
 
 
 # get_item()
 #_________________________________________________________________________________________
-def get_item(identifier, metadata_timeout=None, config=None):
-    return item.Item(identifier, metadata_timeout, config)
+def get_item(identifier, metadata_timeout=None, config=None, archive_session=None,
+             lazy=False):
+    return item.Item(identifier, metadata_timeout, config, archive_session, lazy)
 
 # get_files()
 #_________________________________________________________________________________________
 def get_files(identifier, files=None, source=None, formats=None, glob_pattern=None,
-              metadata_timeout=None, config=None):
-    item = get_item(identifier, metadata_timeout, config)
+              metadata_timeout=None, config=None, archive_session=None):
+    item = get_item(identifier, metadata_timeout, config, archive_session)
     return item.get_files(files, source, formats, glob_pattern)
 
 # iter_files()
 #_________________________________________________________________________________________
-def iter_files(identifier, metadata_timeout=None, config=None):
-    item = get_item(identifier, metadata_timeout, config)
+def iter_files(identifier, metadata_timeout=None, config=None, archive_session=None):
+    item = get_item(identifier, metadata_timeout, config, archive_session)
     return item.iter_files()
 
 # modify_metadata()
@@ -38,7 +40,7 @@ def upload(identifier, files, **kwargs):
 
     :type kwargs: dict
     :param kwargs: The keyword arguments from the call to
-                   upload_file().
+                   Item.upload(), e.g. ``workers`` and ``retries``.
 
     Usage::
 
@@ -53,7 +55,7 @@ def upload(identifier, files, **kwargs):
               uploaded, False otherwise.
 
     """
-    item = get_item(identifier)
+    item = get_item(identifier, lazy=True)
     return item.upload(files, **kwargs)
 
 # download()
@@ -67,6 +69,10 @@ def download(identifier, filenames=None, **kwargs):
     :type concurrent: bool
     :param concurrent: Download files concurrently if ``True``.
 
+    :type workers: int
+    :param workers: (optional) The number of threads used to download
+                    files concurrently.
+
     :type source: str
     :param source: Only download files matching given source.
 
@@ -81,8 +87,11 @@ def download(identifier, filenames=None, **kwargs):
     :param ignore_existing: Overwrite local files if they already
                             exist.
 
-    :rtype: bool
-    :returns: True if if files have been downloaded successfully.
+    :rtype: :class:`DownloadResults <DownloadResults>`
+    :returns: The files downloaded and skipped. It evaluates to ``True``
+              if no file failed to download. Files downloaded with
+              ``workers`` that fail are recorded in its ``errors``
+              rather than raised.
 
     Usage::
 
@@ -94,11 +103,13 @@ def download(identifier, filenames=None, **kwargs):
     if filenames:
         if not isinstance(filenames, (set, list)):
             filenames = [filenames]
+        results = DownloadResults()
         for fname in filenames:
             f = item.get_file(fname)
-            f.download(**kwargs)
+            results.add_downloaded(f, f.download(**kwargs))
+        return results
     else:
-        item.download(**kwargs)
+        return item.download(**kwargs)
 
 # delete()
 #_________________________________________________________________________________________
@@ -107,8 +118,9 @@ def delete(identifier, filenames=None, **kwargs):
     if filenames:
         if not isinstance(filenames, (set, list)):
             filenames = [filenames]
-        for f in item.iter_files():
-            if not f.name in filenames:
+        for fname in filenames:
+            f = item.get_file(fname)
+            if f is None:
                 continue
             f.delete(**kwargs)
 
@@ -116,7 +128,9 @@ def delete(identifier, filenames=None, **kwargs):
 #_________________________________________________________________________________________
 def get_tasks(**kwargs):
     _catalog = catalog.Catalog(identifier=kwargs.get('identifier'),
-                              params=kwargs.get('params'))
+                              params=kwargs.get('params'),
+                              config=kwargs.get('config'),
+                              archive_session=kwargs.get('archive_session'))
     task_type = kwargs.get('task_type')
     if task_type:
         return eval('_catalog.{0}_rows'.format(task_type.lower()))
@@ -133,3 +147,9 @@ def search_items(query, **kwargs):
 def get_data_miner(identifiers, **kwargs):
     from . import mine
     return mine.Mine(identifiers, **kwargs)
+
+# async_mine()
+#_________________________________________________________________________________________
+def get_async_data_miner(identifiers, **kwargs):
+    from . import aiomine
+    return aiomine.AsyncMine(identifiers, **kwargs)
@@ -0,0 +1,280 @@
+try:
+    import ujson as json
+except ImportError:
+    import json
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+
+
+log = logging.getLogger(__name__)
+
+
+# DiskCache class
+#_________________________________________________________________________________________
+class DiskCache(object):
+    """A persistent, size-bounded LRU cache of JSON documents.
+
+    Every entry is stored as a small gzipped JSON file named after the
+    SHA-1 of its key. Reading an entry bumps its mtime, and the least
+    recently used entries are evicted once ``max_entries`` is exceeded.
+    Entries older than ``ttl`` seconds are not discarded, they are
+    reported as stale so they can be revalidated (e.g. with a conditional
+    GET) instead of refetched.
+
+    Usage::
+
+        >>> from internetarchive.cache import DiskCache
+        >>> cache = DiskCache('/tmp/ia-cache', ttl=3600, max_entries=1000)
+        >>> cache.set('nasa', {'metadata': {'identifier': 'nasa'}})
+        >>> cache.get('nasa')['value']
+        {'metadata': {'identifier': 'nasa'}}
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, path, ttl=3600, max_entries=10000):
+        """
+        :type path: str
+        :param path: The directory to store cache entries in. It is
+                     created if it does not exist.
+
+        :type ttl: int
+        :param ttl: (optional) The number of seconds an entry is
+                    considered fresh. ``None`` means entries never go
+                    stale.
+
+        :type max_entries: int
+        :param max_entries: (optional) The maximum number of entries to
+                            keep on disk.
+
+        """
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        # Counters, updated by the consumers of the cache with count().
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        self._lock = threading.Lock()
+        # The cache is shared by the threads using a session.
+        self._stats_lock = threading.Lock()
+        self._entry_count = None
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return ('DiskCache(path={0!r}, hits={1!r}, misses={2!r}, '
+                'revalidations={3!r})'.format(self.path, self.hits, self.misses,
+                                              self.revalidations))
+
+    # _entry_path()
+    #_____________________________________________________________________________________
+    def _entry_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, '{0}.json.gz'.format(digest))
+
+    # _list_entries()
+    #_____________________________________________________________________________________
+    def _list_entries(self):
+        return [os.path.join(self.path, f) for f in os.listdir(self.path)
+                if f.endswith('.json.gz')]
+
+    # get()
+    #_____________________________________________________________________________________
+    def get(self, key):
+        """Get the entry stored for ``key``.
+
+        :rtype: dict
+        :returns: The entry, a dict with the keys ``value``, ``stored``
+                  and any extra info passed to :meth:`set`, or ``None``.
+
+        """
+        path = self._entry_path(key)
+        try:
+            fp = gzip.open(path, 'rb')
+            try:
+                entry = json.loads(fp.read().decode('utf-8'))
+            finally:
+                fp.close()
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        return entry
+
+    # contains()
+    #_____________________________________________________________________________________
+    def contains(self, key):
+        """Return ``True`` if an entry is stored for ``key``, marking it as
+        recently used without reading it."""
+        try:
+            os.utime(self._entry_path(key), None)
+        except OSError:
+            return False
+        return True
+
+    # is_fresh()
+    #_____________________________________________________________________________________
+    def is_fresh(self, entry):
+        """Return ``True`` if ``entry`` has not outlived the cache's TTL."""
+        if self.ttl is None:
+            return True
+        return (time.time() - entry.get('stored', 0)) < self.ttl
+
+    # set()
+    #_____________________________________________________________________________________
+    def set(self, key, value, **info):
+        """Store ``value`` under ``key``.
+
+        :type info: dict
+        :param info: (optional) Extra JSON-serializable details stored
+                     alongside the value, e.g. validators such as an
+                     ``etag`` for later revalidation.
+
+        """
+        entry = dict(info)
+        entry.update(key=key, value=value, stored=time.time())
+        path = self._entry_path(key)
+        tmp_path = '{0}.{1}.{2}.tmp'.format(path, os.getpid(),
+                                            threading.current_thread().ident)
+        is_new = not os.path.exists(path)
+        try:
+            fp = gzip.open(tmp_path, 'wb')
+            try:
+                fp.write(json.dumps(entry).encode('utf-8'))
+            finally:
+                fp.close()
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # os.rename() does not overwrite existing files on Windows.
+                os.remove(path)
+                os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            log.warning('could not write cache entry for {0}, {1}'.format(key, e))
+            return
+        if is_new:
+            self._increment_count()
+
+    # touch()
+    #_____________________________________________________________________________________
+    def touch(self, key, entry):
+        """Mark a stale ``entry`` as fresh again, e.g. after a successful
+        revalidation.
+
+        """
+        info = dict((k, v) for (k, v) in entry.items()
+                    if k not in ('key', 'value', 'stored'))
+        self.set(key, entry['value'], **info)
+
+    # delete()
+    #_____________________________________________________________________________________
+    def delete(self, key):
+        """Remove the entry stored for ``key``, if any."""
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            return
+        with self._lock:
+            if self._entry_count is not None:
+                self._entry_count -= 1
+
+    # clear()
+    #_____________________________________________________________________________________
+    def clear(self):
+        """Remove every entry from the cache."""
+        for path in self._list_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._entry_count = 0
+
+    # _increment_count()
+    #_____________________________________________________________________________________
+    def _increment_count(self):
+        with self._lock:
+            if self._entry_count is None:
+                self._entry_count = len(self._list_entries())
+            else:
+                self._entry_count += 1
+            if self.max_entries is None or self._entry_count <= self.max_entries:
+                return
+            self._evict()
+
+    # _evict()
+    #_____________________________________________________________________________________
+    def _evict(self):
+        # Evict a tenth of the cache at once, so that listing the cache
+        # directory is amortized over many writes.
+        entries = []
+        for path in self._list_entries():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        entries.sort()
+        target = self.max_entries - (self.max_entries // 10)
+        excess = max(len(entries) - target, 0)
+        for mtime, path in entries[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._entry_count = len(entries) - excess
+        log.debug('evicted {0} entries from {1}'.format(excess, self.path))
+
+    # count()
+    #_____________________________________________________________________________________
+    def count(self, counter):
+        """Increment ``counter``, one of ``'hits'``, ``'misses'`` or
+        ``'revalidations'``."""
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # stats()
+    #_____________________________________________________________________________________
+    def stats(self):
+        """Return the cache's hit/miss counters as a dict."""
+        with self._stats_lock:
+            return dict(hits=self.hits, misses=self.misses,
+                        revalidations=self.revalidations)
+
+
+# get_cache()
+#_________________________________________________________________________________________
+def get_cache(name, config):
+    """Build the :class:`DiskCache <DiskCache>` configured in the ``cache``
+    section of ``config`` under ``name``, e.g.::
+
+        cache:
+            metadata:
+                path: ~/.cache/internetarchive/metadata
+                ttl: 3600
+                max_entries: 10000
+
+    :rtype: :class:`DiskCache <DiskCache>`
+    :returns: The cache, or ``None`` if it is not configured.
+
+    """
+    cache_config = (config.get('cache') or {}).get(name)
+    if not cache_config:
+        return None
+    if not isinstance(cache_config, dict):
+        cache_config = {}
+    default_path = os.path.join('~', '.cache', 'internetarchive', name)
+    return DiskCache(
+        path=cache_config.get('path', default_path),
+        ttl=cache_config.get('ttl', 3600),
+        max_entries=cache_config.get('max_entries', 10000),
+    )
@@ -4,8 +4,6 @@ except ImportError:
     import json
 from six.moves.urllib.parse import parse_qsl
 
-import requests.sessions
-
 from . import session
 
 
@@ -25,16 +23,21 @@ class Catalog(object):
     # init()
     #_____________________________________________________________________________________
     def __init__(self, identifier=None, task_ids=None, params={}, verbose=True,
-                 config=None):
+                 config=None, archive_session=None):
         verbose = '1' if verbose else '0'
         params = {} if not params else params
 
-        self.session = session.ArchiveSession(config)
-        self.http_session = requests.sessions.Session()
+        if archive_session is None:
+            if config:
+                archive_session = session.get_session(config)
+            else:
+                archive_session = session.get_default_session()
+        self.session = archive_session
+        self.http_session = self.session.http_session
 
-        # Set cookies from config.
-        self.http_session.cookies = self.session.cookies
-        self.http_session.cookies['verbose'] = verbose
+        # The ``verbose`` cookie is sent per request, so it does not leak
+        # into the shared session's cookie jar.
+        self.cookies = dict(verbose=verbose)
 
         # Params required to retrieve JSONP from the IA catalog.
         self.params = dict(
@@ -71,7 +74,7 @@ class Catalog(object):
     # _get_tasks()
     #_____________________________________________________________________________________
     def _get_tasks(self):
-        r = self.http_session.get(self.url, params=self.params)
+        r = self.http_session.get(self.url, params=self.params, cookies=self.cookies)
         # Convert JSONP to JSON (then parse the JSON).
         json_str = r.content[(r.content.index("(") + 1):r.content.rindex(")")]
         return [
@@ -102,7 +105,7 @@ class CatalogTask(object):
     #_____________________________________________________________________________________
     def __init__(self, columns, http_session=None):
         if not http_session:
-            self._http_session = requests.sessions.Session()
+            self._http_session = session.get_default_session().http_session
         else:
             self._http_session = http_session
 
@@ -0,0 +1,138 @@
+try:
+    import ujson as json
+except ImportError:
+    import json
+import os
+import time
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+# Checkpoint class
+#_________________________________________________________________________________________
+class Checkpoint(object):
+    """Records which entries of a long input list have been processed,
+    so that an interrupted run can be resumed without redoing them.
+
+    Entries are identified by their index in the input, and stored as a
+    bitmap, i.e. one bit per entry: a checkpoint of 20 million entries
+    takes 2.5 MB. Entries that failed are also listed by index, so they
+    can be reported. The input must be the same, in the same order, when
+    resuming.
+
+    The checkpoint is written atomically every ``interval`` seconds and
+    when :meth:`save` is called. ``flush`` is called before every write,
+    so that output written for the recorded entries can be flushed first.
+    Entries processed since the last write are processed again when
+    resuming; ``info`` is saved along with the checkpoint, e.g. to record
+    the size of the output so that it can be truncated back to it::
+
+        >>> from internetarchive.checkpoint import Checkpoint
+        >>> output = open('metadata.json', 'a')
+        >>> checkpoint = Checkpoint('metadata.json.checkpoint', flush=output.flush)
+        >>> for i, identifier in enumerate(identifiers):
+        ...     if i in checkpoint:
+        ...         continue
+        ...     output.write(get_metadata(identifier))
+        ...     checkpoint.add(i)
+        >>> checkpoint.save()
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, path, interval=10, flush=None):
+        """
+        :type path: str
+        :param path: The file to keep the checkpoint in. An existing
+                     checkpoint is loaded from it.
+
+        :type interval: float
+        :param interval: (optional) The number of seconds between writes.
+
+        :type flush: callable
+        :param flush: (optional) Called before every write.
+
+        """
+        self.path = os.path.expanduser(path)
+        self.interval = interval
+        self.flush = flush
+        self.bitmap = bytearray()
+        self.skipped = set()
+        self.count = 0
+        self.info = {}
+        self.saved = time.time()
+        if os.path.exists(self.path):
+            self.load()
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'Checkpoint(path={0!r}, count={1!r}, skipped={2!r})'.format(
+            self.path, self.count, len(self.skipped))
+
+    # __contains__()
+    #_____________________________________________________________________________________
+    def __contains__(self, index):
+        byte = index >> 3
+        return byte < len(self.bitmap) and bool(self.bitmap[byte] & (1 << (index & 7)))
+
+    # __len__()
+    #_____________________________________________________________________________________
+    def __len__(self):
+        return self.count
+
+    # add()
+    #_____________________________________________________________________________________
+    def add(self, index, skipped=False):
+        """Record the entry at ``index`` as processed, or as failed if
+        ``skipped`` is True, and write the checkpoint if ``interval``
+        seconds have passed since the last write.
+
+        """
+        byte = index >> 3
+        if byte >= len(self.bitmap):
+            # Grow geometrically, so that appending is amortized.
+            self.bitmap.extend(bytearray(max(byte + 1 - len(self.bitmap),
+                                             len(self.bitmap))))
+        if not self.bitmap[byte] & (1 << (index & 7)):
+            self.bitmap[byte] |= 1 << (index & 7)
+            self.count += 1
+        if skipped:
+            self.skipped.add(index)
+        if time.time() - self.saved >= self.interval:
+            self.save()
+
+    # load()
+    #_____________________________________________________________________________________
+    def load(self):
+        with open(self.path, 'rb') as fp:
+            header = json.loads(fp.readline().decode('utf-8'))
+            self.bitmap = bytearray(fp.read())
+        self.skipped = set(header.get('skipped', []))
+        self.count = header.get('count', 0)
+        self.info = header.get('info', {})
+        log.info('loaded checkpoint {0}, {1} entries processed'.format(self.path,
+                                                                       self.count))
+
+    # save()
+    #_____________________________________________________________________________________
+    def save(self):
+        """Write the checkpoint, replacing the previous one atomically."""
+        if self.flush:
+            self.flush()
+        header = dict(count=self.count, skipped=sorted(self.skipped), info=self.info)
+        tmp_path = '{0}.tmp'.format(self.path)
+        with open(tmp_path, 'wb') as fp:
+            fp.write(json.dumps(header).encode('utf-8') + b'\n')
+            fp.write(bytes(self.bitmap.rstrip(b'\x00')))
+            fp.flush()
+            os.fsync(fp.fileno())
+        try:
+            os.rename(tmp_path, self.path)
+        except OSError:
+            # os.rename() does not overwrite existing files on Windows.
+            os.remove(self.path)
+            os.rename(tmp_path, self.path)
+        self.saved = time.time()
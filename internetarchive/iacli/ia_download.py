@@ -1,10 +1,11 @@
 """Download files from archive.org.
 
 usage:
-    ia download [--verbose] [--dry-run] [--ignore-existing]
+    ia download [--verbose] [--dry-run] [--ignore-existing] [--resume]
+                [--sync [--checksum]]
                 [--source=<source>... | --original]
-                [--glob=<pattern> | --format=<format>...] [--concurrent] <identifier>
-                [<file>...]
+                [--glob=<pattern> | --format=<format>...]
+                [--concurrent | --workers=<count>] <identifier> [<file>...]
     ia download --help
 
 options:
@@ -12,6 +13,11 @@ options:
     -v, --verbose             Print download progress to stdout.
     -d, --dry-run             Print URLs to stdout and exit.
     -i, --ignore-existing     Clobber files already downloaded.
+    -r, --resume              Resume partially downloaded files.
+    -S, --sync                Only download files that are missing locally
+                              or whose size or mtime differ from the item's
+                              metadata.
+    -C, --checksum            When syncing, also compare MD5 checksums.
     -s, --source=<source>...  Only download files matching the given source.
     -o, --original            Only download files with source=original.
     -g, --glob=<pattern>      Only download files whose filename matches the
@@ -23,9 +29,9 @@ options:
 
                                   ia metadata --formats <identifier>
 
-    -c, --concurrent          Download files concurrently using the Python
-                              gevent networking library (gevent must be
-                              installed).
+    -c, --concurrent          Download files concurrently.
+    -w, --workers=<count>     Download files concurrently using the given
+                              number of threads.
 
 """
 import os
@@ -56,11 +62,16 @@ def main(argv):
             fname = f.encode('utf-8')
             path = os.path.join(identifier, fname)
             f = item.get_file(fname)
+            if args['--sync'] and f.is_synced(path, checksum=args['--checksum']):
+                sys.stdout.write(' skipping unchanged: {0}\n'.format(fname))
+                continue
             if args['--dry-run']:
                 sys.stdout.write(f.url + '\n')
             else:
                 sys.stdout.write(' downloading: {0}\n'.format(fname))
-                f.download(file_path=path, ignore_existing=args['--ignore-existing'])
+                ignore_existing = args['--ignore-existing'] or args['--sync']
+                f.download(file_path=path, ignore_existing=ignore_existing,
+                           resume=args['--resume'])
         sys.exit(0)
 
     # Otherwise, download the entire item.
@@ -71,7 +82,8 @@ def main(argv):
     else:
         ia_source = None
 
-    item.download(
+    workers = int(args['--workers']) if args['--workers'] else None
+    results = item.download(
         concurrent=args['--concurrent'],
         source=ia_source,
         formats=args['--format'],
@@ -79,5 +91,13 @@ def main(argv):
         dry_run=args['--dry-run'],
         verbose=args['--verbose'],
         ignore_existing=args['--ignore-existing'],
+        resume=args['--resume'],
+        sync=args['--sync'],
+        checksum=args['--checksum'],
+        workers=workers,
     )
-    sys.exit(0)
+    if args['--sync'] and not args['--dry-run']:
+        sys.stdout.write(' {0}\n'.format(results.summary()))
+    for fname, error in results.errors.items():
+        sys.stderr.write(' error downloading {0}: {1}\n'.format(fname, error))
+    sys.exit(0 if results else 1)
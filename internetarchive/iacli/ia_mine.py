@@ -1,7 +1,9 @@
 """Concurrently download metadata for items on Archive.org.
 
 usage:
-    ia mine [--cache | --output=<output.json>] [--workers=<count>] <itemlist.txt>
+    ia mine [--cache | --output=<output.json>] [--workers=<count>] [--ordered]
+            [--progress] [--rate-limit=<requests/s>] [--adaptive]
+            [--checkpoint=<path>] [--resume] <itemlist.txt>
     ia mine --help
 
 options:
@@ -9,14 +11,29 @@ options:
     -c, --cache                 Write item metadata to a file called <identifier>_meta.json
     -o, --output=<output.json>  Write all metadata to a single output file <itemlist>.json
     -w, --workers=<count>       The number of requests to run concurrently [default: 20]
+    --ordered                   Output metadata in the same order as <itemlist.txt>.
+    -p, --progress              Print the number of items mined so far to stderr.
+    --rate-limit=<requests/s>   The maximum number of requests per second.
+    --adaptive                  Use fewer workers while requests are failing.
+    --checkpoint=<path>         Record the items mined so far in this file. Defaults
+                                to <output.json>.checkpoint when using --output.
+    -r, --resume                Skip the items recorded in the checkpoint by a previous
+                                run with the same <itemlist.txt>, and append to the
+                                existing output.
 
 """
+try:
+    import ujson as json
+except ImportError:
+    import json
+import os
 import sys
-import json
+import time
 
 from docopt import docopt
 
 from internetarchive import get_data_miner
+from internetarchive.checkpoint import Checkpoint
 
 
 # ia_mine()
@@ -28,25 +45,76 @@ def main(argv):
         itemfile = sys.stdin
     else:
         itemfile = open(args['<itemlist.txt>'])
-    with itemfile:
-        identifiers = [i.strip() for i in itemfile]
-
-    workers = int(args.get('--workers', 20)[0])
-    miner = get_data_miner(identifiers, workers=workers)
-
-    for i, item in miner:
-        metadata = json.dumps(item.metadata)
-        if args['--cache']:
-            sys.stdout.write('saving metadata for: {0}\n'.format(item.identifier))
-            with open('{0}_meta.json'.format(item.identifier), 'w') as fp:
-                fp.write(metadata)
-        elif args['--output']:
-            sys.stdout.write('saving metadata for: {0}\n'.format(item.identifier))
-            with open(args['--output'], 'a+') as fp:
-                fp.write(metadata + '\n')
-        else:
-            try:
-                sys.stdout.write(metadata + '\n')
-            except IOError:
-                break
+    # Identifiers are read from the item list as they are needed, rather
+    # than all at once.
+    identifiers = (line.strip() for line in itemfile if line.strip())
+
+    # Keep a single handle open for the whole run, rather than reopening
+    # the output file for every item.
+    output = open(args['--output'], 'a') if args['--output'] else None
+
+    checkpoint_path = args['--checkpoint']
+    if not checkpoint_path and args['--output']:
+        checkpoint_path = '{0}.checkpoint'.format(args['--output'])
+    if args['--resume'] and not (checkpoint_path and os.path.exists(checkpoint_path)):
+        sys.stderr.write('error: no checkpoint to resume from.\n')
+        sys.exit(1)
+    checkpoint = None
+    if checkpoint_path:
+        if not args['--resume'] and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        # Items are only recorded once their metadata is on disk, along
+        # with the size of the output at that point.
+        out = output or sys.stdout
+        def flush():
+            out.flush()
+            if output:
+                os.fsync(output.fileno())
+                checkpoint.info['output_size'] = output.tell()
+        checkpoint = Checkpoint(checkpoint_path, flush=flush)
+        # Drop the output of items mined after the checkpoint was last
+        # saved, they are mined again.
+        if output and 'output_size' in checkpoint.info:
+            output.truncate(checkpoint.info['output_size'])
+
+    workers = int(args['--workers'])
+    rate_limit = float(args['--rate-limit']) if args['--rate-limit'] else None
+    miner = get_data_miner(identifiers, workers=workers, ordered=args['--ordered'],
+                           rate_limit=rate_limit, adaptive=args['--adaptive'],
+                           checkpoint=checkpoint)
+
+    last_progress = 0
+    results = iter(miner)
+    try:
+        for i, item in results:
+            if args['--progress'] and time.time() - last_progress >= 1:
+                last_progress = time.time()
+                sys.stderr.write('\r mined {0} items, {1:.1f} items/s'.format(
+                    miner.got_count, miner.items_per_second))
+            metadata = json.dumps(item.metadata)
+            if args['--cache']:
+                sys.stdout.write('saving metadata for: {0}\n'.format(item.identifier))
+                with open('{0}_meta.json'.format(item.identifier), 'w') as fp:
+                    fp.write(metadata)
+            elif output:
+                sys.stdout.write('saving metadata for: {0}\n'.format(item.identifier))
+                output.write(metadata + '\n')
+            else:
+                try:
+                    sys.stdout.write(metadata + '\n')
+                except IOError:
+                    break
+    finally:
+        # Save the checkpoint while the output is still open.
+        results.close()
+        itemfile.close()
+        if output:
+            output.close()
+    if args['--progress']:
+        sys.stderr.write('\n')
+    sys.stderr.write('mined {0} items, {1:.1f} items/s, {2} skipped\n'.format(
+        miner.got_count, miner.items_per_second, len(miner.skips)))
+    if miner.resumed_count:
+        sys.stderr.write('{0} items were mined by a previous run\n'.format(
+            miner.resumed_count))
     sys.exit(0)
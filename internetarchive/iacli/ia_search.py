@@ -3,7 +3,8 @@ API <https://archive.org/advancedsearch.php#raw>.
 
 usage:
     ia search [--parameters=<key:value>...] [--sort=<field:order>]
-              [--field=<field>...] [--number-found] <query>...
+              [--field=<field>...] [--number-found] [--scrape]
+              [--prefetch=<pages>] <query>...
     ia search --help
 
 options:
@@ -14,6 +15,11 @@ options:
                                      and "desc" for descending.
     -f, --field=<field>...           Metadata fields to return.
     -n, --number-found               Print the number of results to stdout.
+    --scrape                         Page through results with the cursor-based
+                                     scrape API, 10,000 results per request.
+                                     Use it to export large result sets.
+    --prefetch=<pages>               The number of pages to fetch ahead of the
+                                     results being printed [default: 4].
 
 """
 import sys
@@ -40,7 +46,8 @@ def main(argv):
     fields = ['identifier'] + args['--field']
 
     query = ' '.join(args['<query>'])
-    search_resp = search_items(query, fields=fields, params=params)
+    search_resp = search_items(query, fields=fields, params=params, scrape=args['--scrape'],
+                               prefetch=int(args['--prefetch']), stream=True)
     if args['--number-found']:
         sys.stdout.write('{0}\n'.format(search_resp.num_found))
         sys.exit(0)
@@ -7,7 +7,9 @@ usage:
               (<file>... | - --remote-name=<name>)
               [--metadata=<key:value>...] [--header=<key:value>...]
               [--no-derive] [--ignore-bucket] [--size-hint=<size>]
-              [--delete] [--log]
+              [--delete] [--log] [--workers=<count>] [--retries=<count>]
+              [--multipart] [--part-size=<MB>]
+              [--journal=<path> [--check-remote]]
     ia upload --help
 
 options:
@@ -21,15 +23,29 @@ options:
     -H, --header=<key:value>...    S3 HTTP headers to send with your request.
     -n, --no-derive                Do not derive uploaded files.
     -i, --ignore-bucket            Destroy and respecify all metadata.
-    -s, --size-hint=<size>         Specify a size-hint for your item.
+    -s, --size-hint=<size>         Specify a size-hint for your item. When
+                                   uploading from stdin, it is also used to
+                                   pick a large enough part size.
     -l, --log                      Log upload results to file.
     --delete                       Delete files after verifying checksums 
                                    [default: False].
+    -w, --workers=<count>          Upload this many files concurrently.
+    --retries=<count>              Retry files that fail with a connection
+                                   error or a server error this many times
+                                   [default: 0].
+    --multipart                    Upload files in parts using the S3
+                                   multipart upload protocol. Data from
+                                   stdin is always uploaded in parts.
+    --part-size=<MB>               The size of each part of a multipart
+                                   upload in MB [default: 64].
+    -j, --journal=<path>           Record uploaded files in this journal,
+                                   and skip the files it lists as uploaded
+                                   and unchanged when uploading again.
+    --check-remote                 Only skip files from the journal that the
+                                   item lists with the same size and MD5.
 
 """
-import os
 import sys
-from tempfile import TemporaryFile
 from xml.dom.minidom import parseString
 from subprocess import call
 
@@ -59,7 +75,13 @@ def main(argv):
         queue_derive=True if args['--no-derive'] is False else False,
         ignore_preexisting_bucket=args['--ignore-bucket'],
         verbose=verbose,
-        delete=args['--delete'])
+        delete=args['--delete'],
+        workers=int(args['--workers']) if args['--workers'] else None,
+        retries=int(args['--retries']),
+        multipart=args['--multipart'],
+        part_size=int(args['--part-size']) * 1048576,
+        journal=args['--journal'],
+        check_remote=args['--check-remote'])
 
     # Upload stdin.
     if args['<file>'] == ['-'] and not args['-']:
@@ -67,16 +89,16 @@ def main(argv):
         call(['ia', 'upload', '--help'])
         sys.exit(1)
     if args['-']:
-        local_file = TemporaryFile()
-        local_file.write(sys.stdin.read())
-        local_file.seek(0)
+        # Stream stdin rather than reading it into memory, it is sent in
+        # parts as it is read.
+        local_file = getattr(sys.stdin, 'buffer', sys.stdin)
         upload_kwargs['key'] = args['--remote-name']
     # Upload files.
     else:
         local_file = args['<file>']
 
     config = {} if not args['--log'] else {'logging': {'level': 'INFO'}}
-    item = get_item(args['<identifier>'], config=config)
+    item = get_item(args['<identifier>'], config=config, lazy=True)
     response = item.upload(local_file, **upload_kwargs)
 
     if args['--debug']:
@@ -87,6 +109,8 @@ def main(argv):
             sys.stdout.write('Endpoint:\n {0}\n\n'.format(r.url))
             sys.stdout.write('HTTP Headers:\n{0}\n'.format(headers))
     else:
+        for key, e in response.errors.items():
+            sys.stderr.write('error uploading {0}: {1}\n'.format(key, e))
         for resp in response:
             if resp.status_code == 200:
                 continue
@@ -95,3 +119,5 @@ def main(argv):
             msg = get_xml_text(error.getElementsByTagName('Message'))
             sys.stderr.write('error "{0}" ({1}): {2}\n'.format(code, resp.status_code, msg))
             sys.exit(1)
+        if response.errors:
+            sys.exit(1)
@@ -1,6 +1,7 @@
 import json
 
 import requests.models
+import six
 
 from . import auth
 
@@ -90,7 +91,8 @@ class S3PreparedRequest(requests.models.PreparedRequest):
                 meta_value = json.dumps(meta_value)
             # Convert the metadata value into a list if it is not already
             # iterable.
-            if not hasattr(meta_value, '__iter__'):
+            if (isinstance(meta_value, six.string_types)
+                    or not hasattr(meta_value, '__iter__')):
                     meta_value = [meta_value]
             # Convert metadata items into HTTP headers and add to
             # ``headers`` dict.
@@ -102,6 +104,12 @@ class S3PreparedRequest(requests.models.PreparedRequest):
                 # translate two hyphens in a row (--) into an underscore (_).
                 header_key = header_key.replace('_', '--')
                 headers[header_key] = value
+        # Newer versions of requests only accept string header values.
+        for header_key, value in list(headers.items()):
+            if value is None:
+                del headers[header_key]
+            elif not isinstance(value, (six.string_types, bytes)):
+                headers[header_key] = str(value)
         super(S3PreparedRequest, self).prepare_headers(headers)
 
 
@@ -4,16 +4,24 @@ except ImportError:
     import json
 import os
 import sys
+import errno
+import time
+import random
+import hashlib
+import threading
 from fnmatch import fnmatch
+from collections import defaultdict, OrderedDict
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
-import requests.sessions
-from requests.exceptions import HTTPError
+from requests.exceptions import HTTPError, RequestException
 from jsonpatch import make_patch
 from clint.textui import progress
 import six
 
 from . import __version__, session, iarequest, utils
+from . import multipart as multipart_upload
+from .journal import UploadJournal
 
 
 log = logging.getLogger(__name__)
@@ -48,9 +56,32 @@ class Item(object):
     <https://archive.org/account/s3.php>`__
 
     """
+    # Attributes populated from the Metadata API. Accessing any of these
+    # on a lazy item triggers the metadata request.
+    metadata_attrs = (
+        'metadata',
+        'files',
+        'created',
+        'd1',
+        'd2',
+        'dir',
+        'files_count',
+        'item_size',
+        'reviews',
+        'server',
+        'uniq',
+        'updated',
+        'exists',
+        '_json',
+        '_file_index',
+        '_format_index',
+        '_source_index',
+    )
+
     # init()
     #_____________________________________________________________________________________
-    def __init__(self, identifier, metadata_timeout=None, config=None):
+    def __init__(self, identifier, metadata_timeout=None, config=None,
+                 archive_session=None, lazy=False):
         """
         :type identifier: str
         :param identifier: The globally unique Archive.org identifier
@@ -63,13 +94,51 @@ class Item(object):
         :type config: dict
         :param secure: (optional) Configuration options for session.
 
+        :type archive_session: :class:`ArchiveSession <ArchiveSession>`
+        :param archive_session: (optional) The session to use. Defaults
+                                to the shared, process-wide session
+                                unless ``config`` is given.
+
+        :type lazy: bool
+        :param lazy: (optional) Defer retrieving the item's metadata until
+                     an attribute that needs it (e.g. ``metadata``,
+                     ``files`` or ``exists``) is first accessed.
+
         """
-        self.session = session.ArchiveSession(config)
+        if archive_session is None:
+            if config:
+                archive_session = session.get_session(config)
+            else:
+                archive_session = session.get_default_session()
+        self.session = archive_session
         self.protocol = 'https:' if self.session.secure else 'http:'
-        self.http_session = requests.sessions.Session()
-        self.http_session.cookies = self.session.cookies
+        self.http_session = self.session.http_session
         self.identifier = identifier
+        self.metadata_timeout = metadata_timeout
+
+        if not lazy:
+            self._load_metadata()
+
+    # __getattr__()
+    #_____________________________________________________________________________________
+    def __getattr__(self, name):
+        # Only called when normal attribute lookup fails, i.e. for the
+        # metadata attributes of a lazy item that has not been loaded yet.
+        if name in self.metadata_attrs and '_json' not in self.__dict__:
+            self._load_metadata()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        # Don't load the metadata of a lazy item just to show it.
+        return ('Item(identifier={0!r}, '
+                'exists={1!r})'.format(self.identifier, self.__dict__.get('exists')))
 
+    # _load_metadata()
+    #_____________________________________________________________________________________
+    def _load_metadata(self):
         # Default empty attributes.
         self.metadata = {}
         self.files = []
@@ -84,21 +153,19 @@ class Item(object):
         self.uniq = None
         self.updated = None
 
-        self._json = self.get_metadata(metadata_timeout)
+        self._json = self.get_metadata(self.metadata_timeout)
         self.exists = False if self._json == {} else True
 
-    # __repr__()
-    #_____________________________________________________________________________________
-    def __repr__(self):
-        return ('Item(identifier={identifier!r}, '
-                'exists={exists!r})'.format(**self.__dict__))
-
     # get_metadata()
     #_____________________________________________________________________________________
     def get_metadata(self, metadata_timeout=None):
         """Get an item's metadata from the `Metadata API
         <http://blog.archive.org/2013/07/04/metadata-api/>`__
 
+        If the session has a metadata cache, fresh cache entries are
+        returned without a request, and stale entries are revalidated
+        with a conditional GET.
+
         :type identifier: str
         :param identifier: Globally unique Archive.org identifier.
 
@@ -106,19 +173,104 @@ class Item(object):
         :returns: Metadat API response.
 
         """
-        url = '{protocol}//archive.org/metadata/{identifier}'.format(**self.__dict__)
-        try:
-            resp = self.http_session.get(url, timeout=metadata_timeout)
-            resp.raise_for_status()
-        except HTTPError as e:
-            error_msg = 'Error retrieving metadata from {0}, {1}'.format(resp.url, e)
-            log.error(error_msg)
-            raise HTTPError(error_msg)
-        metadata = resp.json()
+        cache = self.session.metadata_cache
+        entry = cache.get(self.identifier) if cache else None
+        if entry and cache.is_fresh(entry):
+            cache.count('hits')
+            metadata = entry['value']
+        else:
+            headers = {}
+            if entry:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+            url = '{protocol}//archive.org/metadata/{identifier}'.format(**self.__dict__)
+            try:
+                resp = self.http_session.get(url, headers=headers,
+                                             timeout=metadata_timeout)
+                resp.raise_for_status()
+            except HTTPError as e:
+                error_msg = 'Error retrieving metadata from {0}, {1}'.format(resp.url, e)
+                log.error(error_msg)
+                raise HTTPError(error_msg, response=resp)
+            if entry and resp.status_code == 304:
+                cache.count('revalidations')
+                cache.touch(self.identifier, entry)
+                metadata = entry['value']
+            else:
+                metadata = resp.json()
+                if cache:
+                    cache.count('misses')
+                    # Don't cache missing items, they may be created at any time.
+                    if metadata:
+                        cache.set(self.identifier, metadata,
+                                  etag=resp.headers.get('etag'),
+                                  last_modified=resp.headers.get('last-modified'))
         for key in metadata:
                 setattr(self, key, metadata[key])
+        self._build_file_index()
         return metadata
 
+    # _build_file_index()
+    #_____________________________________________________________________________________
+    def _build_file_index(self):
+        """Index the positions of the item's files in ``self.files`` by
+        name, format and source, so that file lookups don't need to scan
+        every file.
+
+        """
+        self._file_index = {}
+        self._format_index = defaultdict(list)
+        self._source_index = defaultdict(list)
+        for i, f in enumerate(self.__dict__.get('files', [])):
+            self._file_index[f.get('name')] = i
+            self._format_index[f.get('format')].append(i)
+            self._source_index[f.get('source')].append(i)
+
+    # _file_from_index()
+    #_____________________________________________________________________________________
+    def _file_from_index(self, i):
+        file_dict = self.files[i]
+        return File(self, file_dict.get('name'), file_dict)
+
+    # _select_files()
+    #_____________________________________________________________________________________
+    def _select_files(self, source=None, formats=None, glob_pattern=None):
+        """Generator for iterating over the files matching all of the
+        given filters, in the order they are listed in the item.
+
+        """
+        positions = None
+        if source:
+            if isinstance(source, six.string_types):
+                source = [source]
+            positions = set(i for s in source for i in self._source_index.get(s, []))
+        if formats:
+            if isinstance(formats, six.string_types):
+                formats = [formats]
+            format_positions = set(i for fmt in formats
+                                   for i in self._format_index.get(fmt, []))
+            if positions is None:
+                positions = format_positions
+            else:
+                positions &= format_positions
+        if positions is None:
+            positions = range(len(self.files))
+        else:
+            positions = sorted(positions)
+        for i in positions:
+            f = self._file_from_index(i)
+            if glob_pattern and not fnmatch(f.name, glob_pattern):
+                continue
+            yield f
+
+    # _invalidate_metadata_cache()
+    #_____________________________________________________________________________________
+    def _invalidate_metadata_cache(self):
+        if self.session.metadata_cache:
+            self.session.metadata_cache.delete(self.identifier)
+
     # iter_files()
     #_____________________________________________________________________________________
     def iter_files(self):
@@ -130,7 +282,7 @@ class Item(object):
 
         """
         for file_dict in self.files:
-            file = File(self, file_dict.get('name'))
+            file = File(self, file_dict.get('name'), file_dict)
             yield file
 
     # file()
@@ -142,15 +294,16 @@ class Item(object):
         :returns: An :class:`internetarchive.File <File>` object.
 
         """
-        for f in self.iter_files():
-            if f.name == file_name:
-                return f
+        i = self._file_index.get(file_name)
+        if i is not None:
+            return self._file_from_index(i)
 
     # get_files()
     #_____________________________________________________________________________________
     def get_files(self, files=None, source=None, formats=None, glob_pattern=None):
         files = [] if not files else files
         source = [] if not source else source
+        formats = [] if not formats else formats
 
         if not isinstance(files, (list, tuple, set)):
             files = [files]
@@ -159,27 +312,32 @@ class Item(object):
         if not isinstance(formats, (list, tuple, set)):
             formats = [formats]
 
-        file_objects = []
-        for f in self.iter_files():
-            if f.name in files:
-                file_objects.append(f)
-            elif f.source in source:
-                file_objects.append(f)
-            elif f.format in formats:
-                file_objects.append(f)
-            elif glob_pattern:
-                if fnmatch(f.name, glob_pattern):
-                    file_objects.append(f)
-        return file_objects
+        positions = set()
+        for name in files:
+            if name in self._file_index:
+                positions.add(self._file_index[name])
+        for src in source:
+            positions.update(self._source_index.get(src, []))
+        for fmt in formats:
+            positions.update(self._format_index.get(fmt, []))
+        if glob_pattern:
+            for i, file_dict in enumerate(self.files):
+                if fnmatch(file_dict.get('name'), glob_pattern):
+                    positions.add(i)
+        return [self._file_from_index(i) for i in sorted(positions)]
 
     # download()
     #_____________________________________________________________________________________
     def download(self, concurrent=False, source=None, formats=None, glob_pattern=None,
-                 dry_run=False, verbose=False, ignore_existing=False):
+                 dry_run=False, verbose=False, ignore_existing=False, workers=None,
+                 resume=False, sync=False, checksum=False):
         """Download the entire item into the current working directory.
 
         :type concurrent: bool
-        :param concurrent: Download files concurrently if ``True``.
+        :param concurrent: Download files concurrently if ``True``. Uses
+                           as many workers as the session keeps
+                           connections open per host, unless ``workers``
+                           is given.
 
         :type source: str
         :param source: Only download files matching given source.
@@ -195,54 +353,80 @@ class Item(object):
         :param ignore_existing: Overwrite local files if they already
                                 exist.
 
-        :rtype: bool
-        :returns: True if if files have been downloaded successfully.
+        :type resume: bool
+        :param resume: (optional) Resume partially downloaded files with
+                       ``Range`` requests instead of failing or
+                       downloading them again from the beginning.
+
+        :type sync: bool
+        :param sync: (optional) Only download files that are missing
+                     locally or differ from the item's metadata, and
+                     overwrite the ones that differ. Local files are
+                     compared by size, and by mtime when the metadata
+                     lists one.
+
+        :type checksum: bool
+        :param checksum: (optional) When syncing, also compare the MD5
+                         checksum of local files.
+
+        :type workers: int
+        :param workers: (optional) Download files concurrently using a
+                        pool of this many threads. Errors are collected
+                        in the returned results instead of being raised.
+                        The number of connections opened per host is
+                        bounded by the session's ``pool_maxsize`` when
+                        ``pool_block`` is set.
+
+        :rtype: :class:`DownloadResults <DownloadResults>`
+        :returns: The files downloaded or skipped, the number of bytes
+                  transferred and skipped, and the errors encountered.
+                  It evaluates to ``True`` if all files have been
+                  downloaded successfully.
 
         """
-        if concurrent:
-            try:
-                from gevent import monkey
-                monkey.patch_socket()
-                from gevent.pool import Pool
-                pool = Pool()
-            except ImportError:
-                raise ImportError(
-                    """No module named gevent
+        if concurrent and not workers:
+            workers = self.session.http_config['pool_maxsize']
 
-                    Downloading files concurrently requires the gevent neworking library.
-                    gevent and all of it's dependencies can be installed with pip:
-
-                    \tpip install cython git+git://github.com/surfly/gevent.git@1.0rc2#egg=gevent
-
-                    """)
-
-        files = self.iter_files()
-        if source:
-            if type(source) == str:
-                source = [source]
-            files = [f for f in files if f.source in source]
-        if formats:
-            if type(formats) == str:
-                formats = [formats]
-            files = [f for f in files if f.format in formats]
-        if glob_pattern:
-            files = [f for f in files if fnmatch(f.name, glob_pattern)]
+        results = DownloadResults()
+        files = self._select_files(source, formats, glob_pattern)
 
+        if workers:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            futures = {}
         for f in files:
-            fname = f.name.encode('utf-8')
+            # Paths are byte strings on Python 2.
+            fname = f.name.encode('utf-8') if six.PY2 else f.name
             path = os.path.join(self.identifier, fname)
+            if sync and f.is_synced(path, checksum=checksum):
+                if verbose:
+                    sys.stdout.write(' skipping unchanged: {0}\n'.format(fname))
+                results.add_skipped(f, path)
+                continue
             if dry_run:
                 sys.stdout.write(f.url + '\n')
                 continue
             if verbose:
                 sys.stdout.write(' downloading: {0}\n'.format(fname))
-            if concurrent:
-                pool.spawn(f.download, path, ignore_existing=ignore_existing)
+            if workers:
+                future = executor.submit(f.download, path,
+                                         ignore_existing=(ignore_existing or sync),
+                                         resume=resume)
+                futures[future] = (f, path)
             else:
-                f.download(path, ignore_existing=ignore_existing)
-        if concurrent:
-            pool.join()
-        return True
+                size = f.download(path, ignore_existing=(ignore_existing or sync),
+                                  resume=resume)
+                results.add_downloaded(f, size)
+        if workers:
+            for future in as_completed(futures):
+                f, path = futures[future]
+                e = future.exception()
+                if e is None:
+                    results.add_downloaded(f, future.result())
+                else:
+                    log.error('error downloading {0}, {1}'.format(f.name, e))
+                    results.errors[f.name] = e
+            executor.shutdown()
+        return results
 
     # modify_metadata()
     #_____________________________________________________________________________________
@@ -280,7 +464,7 @@ class Item(object):
         if target.startswith('files/'):
             src = self.get_file(target[6:]).__dict__
         else:
-            src = self.__dict__.get(target, {})
+            src = self._json.get(target, {})
         dest = src.copy()
         dest.update(metadata)
 
@@ -307,6 +491,7 @@ class Item(object):
             return request
         prepared_request = request.prepare()
         resp = self.http_session.send(prepared_request)
+        self._invalidate_metadata_cache()
         self._json = self.get_metadata()
         return resp
 
@@ -315,12 +500,17 @@ class Item(object):
     def upload_file(self, body, key=None, metadata={}, headers={},
                     access_key=None, secret_key=None, queue_derive=True,
                     ignore_preexisting_bucket=False, verbose=False, verify=True, 
-                    delete=False, debug=False, **kwargs):
+                    delete=False, debug=False, multipart=False, part_size=67108864,
+                    part_workers=4, upload_id=None, resume=False, checksum_manifest=None,
+                    hash_while_sending=False, **kwargs):
         """Upload a single file to an item. The item will be created
         if it does not exist.
 
         :type body: Filepath or file-like object.
-        :param body: File or data to be uploaded.
+        :param body: File or data to be uploaded. File-like objects that
+                     can't be seeked, such as ``sys.stdin``, are streamed
+                     in parts using a multipart upload and require
+                     ``key``.
 
         :type key: str
         :param key: (optional) Remote filename.
@@ -341,7 +531,31 @@ class Item(object):
 
         :type verify: bool
         :param verify: (optional) Verify local MD5 checksum matches the MD5 
-                       checksum of the file received by IAS3.
+                       checksum of the file received by IAS3. The checksum
+                       is sent as the Content-MD5 header, so IAS3 rejects
+                       a corrupt upload before storing it. Unless it is
+                       listed in ``checksum_manifest``, it is computed in
+                       a separate pass over the file before sending it.
+
+        :type hash_while_sending: bool
+        :param hash_while_sending: (optional) With ``verify`` or ``delete``,
+                                   compute the checksum while the file is
+                                   being sent instead, so the file is only
+                                   read once, and compare it to the ETag
+                                   returned by IAS3. A mismatch raises
+                                   IOError, but only after the corrupt file
+                                   has been stored. If no ETag is returned,
+                                   the upload can't be verified: a warning
+                                   is logged and the local file is not
+                                   deleted.
+
+        :type checksum_manifest: dict or str
+        :param checksum_manifest: (optional) Pre-computed MD5 checksums,
+                                  either a dict keyed by remote filename or
+                                  local path, or the path to a file in the
+                                  format written by ``md5sum``. Listed
+                                  checksums are sent as the Content-MD5
+                                  header.
 
         :type delete: bool
         :param delete: (optional) Delete local file after the upload has been
@@ -354,6 +568,28 @@ class Item(object):
         :param debug: (optional) Set to True to print headers to stdout, and
                       exit without sending the upload request.
 
+        :type multipart: bool
+        :param multipart: (optional) Upload the file in parts using the S3
+                          multipart upload protocol. Each part is checked
+                          with its own MD5 checksum, and failed parts are
+                          retried individually.
+
+        :type part_size: int
+        :param part_size: (optional) The size of each part of a multipart
+                          upload in bytes.
+
+        :type part_workers: int
+        :param part_workers: (optional) The number of parts of a multipart
+                             upload sent concurrently.
+
+        :type upload_id: str
+        :param upload_id: (optional) Resume the multipart upload with this
+                          ID, skipping the parts that were already uploaded.
+
+        :type resume: bool
+        :param resume: (optional) Resume the most recent in-progress
+                       multipart upload of this file, if there is one.
+
         Usage::
 
             >>> import internetarchive
@@ -366,42 +602,106 @@ class Item(object):
         access_key = self.session.access_key if not access_key else access_key
         secret_key = self.session.secret_key if not secret_key else secret_key
 
+        # Copy the dicts, so that per-file headers don't leak into the
+        # caller's (or the default) dicts.
+        headers = dict(headers)
+        metadata = dict(metadata)
+
         if not hasattr(body, 'read'):
-            body = open(body, 'rb')
+            body = open(body, 'rb', 1048576)
 
         if not metadata.get('scanner'):
             scanner = 'Internet Archive Python library {0}'.format(__version__)
             metadata['scanner'] = scanner
 
+        # Pipes, sockets and stdin can't be seeked, their size is unknown.
         try:
             body.seek(0, os.SEEK_END)
             size = body.tell()
             body.seek(0, os.SEEK_SET)
-        except IOError:
+        except (IOError, OSError, ValueError, AttributeError):
             size = None
 
         if not headers.get('x-archive-size-hint'):
             headers['x-archive-size-hint'] = size
 
-        key = body.name.split('/')[-1] if key is None else key
+        if key is None:
+            name = getattr(body, 'name', None)
+            # e.g. '<stdin>' or the file descriptor of a temporary file.
+            if not isinstance(name, six.string_types) or name.startswith('<'):
+                raise ValueError('key is required when uploading a stream.')
+            key = name.split('/')[-1]
         base_url = '{protocol}//s3.us.archive.org/{identifier}'.format(**self.__dict__)
         url = '{base_url}/{key}'.format(base_url=base_url, key=key)
+
+        # Streams of unknown size are read sequentially and sent in parts,
+        # so that at most ``part_workers + 1`` parts are held in memory no
+        # matter how large the stream is.
+        if size is None:
+            multipart = True
+
+        if multipart or upload_id or resume:
+            # S3 allows at most 10,000 parts per upload. The size of a
+            # stream can be given as a size hint.
+            expected_size = size or headers.get('x-archive-size-hint')
+            if expected_size:
+                part_size = max(part_size, -(-int(expected_size) // 10000))
+            upload = multipart_upload.MultipartUpload(
+                self, key,
+                metadata=metadata,
+                headers=headers,
+                access_key=access_key,
+                secret_key=secret_key,
+                part_size=part_size,
+                workers=part_workers,
+                upload_id=upload_id,
+            )
+            if debug:
+                return upload
+            if verbose:
+                sys.stdout.write(' uploading {f} in parts\n'.format(f=key))
+            try:
+                if resume and not upload.upload_id:
+                    upload.upload_id = upload.find_upload_id()
+                response = upload.upload(body)
+            except HTTPError as e:
+                log.error('error uploading {0}, {1}'.format(key, e))
+                if e.response is None:
+                    raise
+                return e.response
+            log.info('uploaded {f} to {u}'.format(f=key, u=url))
+            self._invalidate_metadata_cache()
+            if delete and size is not None:
+                os.remove(body.name)
+            return response
         # require the Content-MD5 header when delete is True.
+        md5 = None
+        hashing_body = None
         if verify or delete:
-            headers['Content-MD5'] = utils.get_md5(body)
+            if checksum_manifest:
+                if isinstance(checksum_manifest, six.string_types):
+                    checksum_manifest = utils.load_md5_manifest(checksum_manifest)
+                local_path = os.path.normpath(str(getattr(body, 'name', '')))
+                for name in [key, local_path, os.path.basename(local_path)]:
+                    md5 = checksum_manifest.get(name)
+                    if md5:
+                        break
+            if not md5 and hash_while_sending:
+                hashing_body = utils.HashingReader(body, size)
+            else:
+                headers['Content-MD5'] = md5 or utils.get_md5(body)
+        # The file is read in large chunks, which are sliced to whatever
+        # size the HTTP client asks for.
+        chunk_size = 1048576
+        chunks = utils.chunk_generator(hashing_body or body, chunk_size)
         if verbose:
             try:
-                chunk_size = 1048576
-                expected_size = size/chunk_size + 1
-                chunks = utils.chunk_generator(body, chunk_size)
-                progress_generator = progress.bar(chunks, expected_size=expected_size,
-                                                  label=' uploading {f}: '.format(f=key))
-                data = utils.IterableToFileAdapter(progress_generator, size)
+                expected_size = size // chunk_size + 1
+                chunks = progress.bar(chunks, expected_size=expected_size,
+                                      label=' uploading {f}: '.format(f=key))
             except:
                 sys.stdout.write(' uploading {f}: '.format(f=key))
-                data = body
-        else:
-            data = body
+        data = utils.IterableToFileAdapter(chunks, size)
 
         request = iarequest.S3Request(
             method='PUT',
@@ -422,8 +722,25 @@ class Item(object):
                 response = self.http_session.send(prepared_request, stream=True)
                 response.raise_for_status()
                 log.info('uploaded {f} to {u}'.format(f=key, u=url))
+                self._invalidate_metadata_cache()
+                verified = 'Content-MD5' in headers
+                if hashing_body:
+                    etag = response.headers.get('etag', '').strip('"')
+                    if etag and etag != hashing_body.hexdigest():
+                        raise IOError('MD5 checksum mismatch uploading {0}: local '
+                                      '{1}, remote {2}'.format(key,
+                                                               hashing_body.hexdigest(),
+                                                               etag))
+                    verified = bool(etag)
+                    if not verified:
+                        log.warning('could not verify the upload of {0}, no ETag '
+                                    'was returned'.format(key))
                 if delete and response.status_code == 200:
-                    os.remove(body.name)
+                    if verified:
+                        os.remove(body.name)
+                    else:
+                        log.warning('not deleting {0}, the upload could not be '
+                                    'verified'.format(body.name))
                 return response
             except HTTPError as e:
                 error_msg = 'error uploading {0}, {1}'.format(key, e)
@@ -433,13 +750,43 @@ class Item(object):
 
     # upload()
     #_____________________________________________________________________________________
-    def upload(self, files, **kwargs):
+    def upload(self, files, workers=None, retries=0, journal=None, check_remote=False,
+               **kwargs):
         """Upload files to an item. The item will be created if it
         does not exist.
 
         :type files: list
         :param files: The filepaths or file-like objects to upload.
 
+        :type workers: int
+        :param workers: (optional) Upload files concurrently using a pool
+                        of this many threads. At most twice as many files
+                        are queued at a time. Progress bars are replaced
+                        by one line per uploaded file. Files that fail with
+                        an exception are recorded in the results' ``errors``
+                        instead of stopping the batch.
+
+        :type retries: int
+        :param retries: (optional) The number of times to retry a file
+                        after a connection error or a 429 or 5xx
+                        response, with exponential backoff. Multipart
+                        uploads are resumed rather than started over.
+
+        :type journal: str or :class:`UploadJournal <UploadJournal>`
+        :param journal: (optional) An upload journal, or the path of its
+                        SQLite database. Files recorded in the journal as
+                        uploaded to this item, and unchanged since, are
+                        skipped, and files uploaded successfully are
+                        recorded, so that an interrupted upload can be
+                        rerun.
+
+        :type check_remote: bool
+        :param check_remote: (optional) Skip files from the journal only
+                             if the item lists them with the same size and
+                             checksum. The item's files are fetched once.
+                             Files are listed once their upload task has
+                             completed.
+
         :type kwargs: dict
         :param kwargs: The keyword arguments from the call to
                        upload_file().
@@ -452,9 +799,9 @@ class Item(object):
             >>> item.upload('/path/to/image.jpg', metadata=md, queue_derive=False)
             True
 
-        :rtype: bool
-        :returns: True if the request was successful and all files were
-                  uploaded, False otherwise.
+        :rtype: :class:`UploadResults <UploadResults>`
+        :returns: The response for each file, in the order the files were
+                  given, and the errors of the files that got none.
 
         """
         def iter_directory(directory):
@@ -467,17 +814,300 @@ class Item(object):
         if not isinstance(files, (list, tuple)):
             files = [files]
 
-        responses = []
-        for f in files:
-            key = None
-            if isinstance(f, six.string_types) and os.path.isdir(f):
-                for filepath, key in iter_directory(f):
-                    resp = self.upload_file(filepath, key=key, **kwargs)
-                    responses.append(resp)
+        # Read a checksum manifest file once, rather than once per file.
+        if isinstance(kwargs.get('checksum_manifest'), six.string_types):
+            kwargs['checksum_manifest'] = utils.load_md5_manifest(
+                kwargs['checksum_manifest'])
+
+        default_key = kwargs.pop('key', None)
+
+        def iter_uploads():
+            for f in files:
+                if isinstance(f, six.string_types) and os.path.isdir(f):
+                    for filepath, key in iter_directory(f):
+                        yield (filepath, key)
+                else:
+                    yield (f, default_key)
+
+        close_journal = isinstance(journal, six.string_types)
+        if close_journal:
+            journal = UploadJournal(journal)
+        try:
+            uploads = iter_uploads()
+            if journal:
+                kwargs['journal'] = journal
+                uploads = self._skip_journaled_uploads(uploads, journal, check_remote,
+                                                       kwargs.get('verbose'))
+            if workers:
+                return self._upload_concurrently(uploads, workers, retries, kwargs)
+
+            results = UploadResults()
+            for body, key in uploads:
+                resp = self._upload_file_with_retries(body, key, retries, **kwargs)
+                results.add_response(self._get_upload_key(body, key), resp)
+            return results
+        finally:
+            if close_journal:
+                journal.close()
+
+    # _skip_journaled_uploads()
+    #_____________________________________________________________________________________
+    def _skip_journaled_uploads(self, uploads, journal, check_remote=False,
+                                verbose=False):
+        remote_files = None
+        for body, key in uploads:
+            if not isinstance(body, six.string_types):
+                yield (body, key)
+                continue
+            key = body.split('/')[-1] if key is None else key
+            entry = journal.get(self.identifier, key, body)
+            if entry and check_remote:
+                # Fetch the item's files once, and only if there is
+                # anything to check.
+                if remote_files is None:
+                    remote_files = self._get_remote_files()
+                remote = remote_files.get(key, {})
+                if (str(remote.get('size')) != str(entry['size'])
+                        or (entry['md5'] and remote.get('md5') != entry['md5'])):
+                    log.info('{0} is in the upload journal but not in {1}, '
+                             'uploading it again'.format(key, self.identifier))
+                    journal.forget(self.identifier, key)
+                    entry = None
+            if not entry:
+                yield (body, key)
+                continue
+            log.info('skipping {0}, already uploaded to {1}'.format(key, self.identifier))
+            if verbose:
+                sys.stdout.write(' skipping {0}, already uploaded.\n'.format(key))
+
+    # _get_remote_files()
+    #_____________________________________________________________________________________
+    def _get_remote_files(self):
+        # Bypass the metadata cache, it is invalidated by uploads from this
+        # session only.
+        url = '{protocol}//archive.org/metadata/{identifier}/files'.format(**self.__dict__)
+        resp = self.http_session.get(url)
+        resp.raise_for_status()
+        return dict((f.get('name'), f) for f in resp.json().get('result', []))
+
+    # _upload_file_with_retries()
+    #_____________________________________________________________________________________
+    def _upload_file_with_retries(self, body, key, retries, journal=None, **kwargs):
+        if retries and not isinstance(body, six.string_types):
+            try:
+                body.seek(0, os.SEEK_CUR)
+            except (IOError, OSError, ValueError, AttributeError):
+                # Streams can't be sent again, and restarting their multipart
+                # upload would orphan the parts already sent. Their parts are
+                # retried individually instead.
+                log.info('not retrying {0} as a whole, it is a stream'.format(
+                    self._get_upload_key(body, key)))
+                retries = 0
+        # Only local files are journaled. They are stat'ed before the upload,
+        # as ``delete`` removes them once uploaded.
+        journal_stat = None
+        if journal and isinstance(body, six.string_types):
+            journal_key = body.split('/')[-1] if key is None else key
+            journal_stat = os.stat(body)
+        for attempt in range(retries + 1):
+            try:
+                response = self.upload_file(body, key=key, **kwargs)
+                status_code = getattr(response, 'status_code', None)
+                if (attempt == retries or status_code is None
+                        or (status_code < 500 and status_code != 429)):
+                    if journal_stat and status_code == 200:
+                        # The ETag of a single PUT is the file's MD5, the
+                        # ETag of a multipart upload is not.
+                        etag = response.headers.get('etag', '').strip('"')
+                        md5 = etag if len(etag) == 32 else None
+                        journal.record(self.identifier, journal_key, body, md5,
+                                       stat=journal_stat)
+                    return response
+                error = 'status code {0}'.format(status_code)
+            except RequestException as e:
+                if attempt == retries or isinstance(e, HTTPError):
+                    raise
+                error = e
+            delay = 2 ** attempt + random.random()
+            log.warning('error uploading {0} ({1}), retrying in {2:.1f}s'.format(
+                key or getattr(body, 'name', body), error, delay))
+            time.sleep(delay)
+            if hasattr(body, 'seek'):
+                body.seek(0, os.SEEK_SET)
+            # Resume a failed multipart upload rather than start a new one,
+            # which would orphan it and send every part again. Only its
+            # missing parts and its completion are sent.
+            if kwargs.get('multipart'):
+                kwargs['resume'] = True
+
+    # _get_upload_key()
+    #_____________________________________________________________________________________
+    def _get_upload_key(self, body, key):
+        """Get the remote filename of an upload, to report it by."""
+        if key is not None:
+            return key
+        name = body if isinstance(body, six.string_types) else getattr(body, 'name', body)
+        return name.split('/')[-1] if isinstance(name, six.string_types) else name
+
+    # _upload_concurrently()
+    #_____________________________________________________________________________________
+    def _upload_concurrently(self, uploads, workers, retries, kwargs):
+        # Progress bars of concurrent uploads would be interleaved.
+        verbose = kwargs.pop('verbose', False)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = {}
+        outcomes = {}
+
+        def collect(done):
+            for future in done:
+                i, name = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    log.error('error uploading {0}, {1}'.format(name, e))
+                    outcomes[i] = (name, None, e)
+                    continue
+                outcomes[i] = (name, response, None)
+                if verbose:
+                    status_code = getattr(response, 'status_code', None)
+                    sys.stdout.write(' uploaded {0} ({1})\n'.format(name, status_code))
+
+        try:
+            for i, (body, key) in enumerate(uploads):
+                # Only list as much of a large directory as is needed to
+                # keep the workers busy.
+                while len(pending) >= workers * 2:
+                    done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(self._upload_file_with_retries, body, key,
+                                         retries, **kwargs)
+                pending[future] = (i, self._get_upload_key(body, key))
+            while pending:
+                done, not_done = wait(pending)
+                collect(done)
+        finally:
+            executor.shutdown()
+
+        results = UploadResults()
+        for i in sorted(outcomes):
+            name, response, error = outcomes[i]
+            if error is None:
+                results.add_response(name, response)
             else:
-                resp = self.upload_file(f, **kwargs)
-                responses.append(resp)
-        return responses
+                results.add_error(name, error)
+        summary = 'uploaded {0} files to {1}, {2} failed'.format(
+            len(outcomes) - len(results.failed), self.identifier, len(results.failed))
+        log.info(summary)
+        if verbose:
+            sys.stdout.write(' {0}\n'.format(summary))
+        return results
+
+
+# UploadResults class
+#_________________________________________________________________________________________
+class UploadResults(list):
+    """The outcome of :meth:`Item.upload() <Item.upload>`: the response
+    of each file, in the order the files were given. Files that got no
+    response because their upload raised an exception are listed in
+    ``errors`` instead, keyed by remote filename, so that the caller can
+    decide whether to raise.
+
+    """
+    # init()
+    #_____________________________________________________________________________________
+    def __init__(self):
+        super(UploadResults, self).__init__()
+        self.keys = []
+        self.errors = OrderedDict()
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'UploadResults(responses={0!r}, failed={1!r})'.format(len(self),
+                                                                     len(self.failed))
+
+    # add_response()
+    #_____________________________________________________________________________________
+    def add_response(self, key, response):
+        self.append(response)
+        self.keys.append(key)
+
+    # add_error()
+    #_____________________________________________________________________________________
+    def add_error(self, key, error):
+        self.errors[key] = error
+
+    # failed
+    #_____________________________________________________________________________________
+    @property
+    def failed(self):
+        """The keys of the files that raised an exception or got an
+        error response."""
+        failed = [k for (k, r) in zip(self.keys, self)
+                  if getattr(r, 'status_code', 200) != 200]
+        return failed + list(self.errors)
+
+    # raise_for_errors()
+    #_____________________________________________________________________________________
+    def raise_for_errors(self):
+        """Raise the exception of the first file that got no response,
+        if any."""
+        for error in self.errors.values():
+            raise error
+
+
+# DownloadResults class
+#_________________________________________________________________________________________
+class DownloadResults(object):
+    """The outcome of :meth:`Item.download() <Item.download>`. It
+    evaluates to ``True`` if no file failed to download.
+
+    """
+    # init()
+    #_____________________________________________________________________________________
+    def __init__(self):
+        self.downloaded = []
+        self.skipped = []
+        self.errors = {}
+        self.bytes_downloaded = 0
+        self.bytes_skipped = 0
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return ('DownloadResults(downloaded={0!r}, skipped={1!r}, '
+                'errors={2!r})'.format(len(self.downloaded), len(self.skipped),
+                                       len(self.errors)))
+
+    # add_downloaded()
+    #_____________________________________________________________________________________
+    def add_downloaded(self, f, size):
+        """Record ``f`` as downloaded, ``size`` being the number of bytes
+        transferred, e.g. only the missing part of a resumed file."""
+        self.downloaded.append(f)
+        self.bytes_downloaded += size or 0
+
+    # add_skipped()
+    #_____________________________________________________________________________________
+    def add_skipped(self, f, path):
+        self.skipped.append(f)
+        self.bytes_skipped += os.path.getsize(path)
+
+    # summary()
+    #_____________________________________________________________________________________
+    def summary(self):
+        """Return a one-line, human readable summary of the results."""
+        return ('downloaded {0} files ({1} bytes), skipped {2} unchanged files '
+                '({3} bytes), {4} errors'.format(len(self.downloaded),
+                                                 self.bytes_downloaded,
+                                                 len(self.skipped), self.bytes_skipped,
+                                                 len(self.errors)))
+
+    # __bool__()
+    #_____________________________________________________________________________________
+    def __bool__(self):
+        return not self.errors
+    __nonzero__ = __bool__
 
 
 # File class
@@ -486,13 +1116,13 @@ class File(object):
     """:todo: document ``internetarchive.File`` class."""
     # init()
     #_____________________________________________________________________________________
-    def __init__(self, item, name):
-        _file = {}
-        for f in item.files:
-            if f.get('name') == name:
-                _file = f
-                break
-    
+    def __init__(self, item, name, file_dict=None):
+        if file_dict is not None:
+            _file = file_dict
+        else:
+            i = item._file_index.get(name)
+            _file = item.files[i] if i is not None else {}
+
         self._item = item
         self.identifier = item.identifier
         self.name = None
@@ -515,26 +1145,277 @@ class File(object):
 
     # download()
     #_____________________________________________________________________________________
-    def download(self, file_path=None, ignore_existing=False):
-        """:todo: document ``internetarchive.File.download()`` method"""
+    def download(self, file_path=None, ignore_existing=False, resume=False,
+                 chunk_size=1048576, preallocate=False, segments=None):
+        """Download the file.
+
+        :type file_path: str
+        :param file_path: (optional) The local path to write the file to.
+                          Defaults to the file's name.
+
+        :type ignore_existing: bool
+        :param ignore_existing: (optional) Overwrite the local file if it
+                                already exists.
+
+        :type resume: bool
+        :param resume: (optional) If a partial local file exists, only
+                       request the missing bytes with a ``Range`` request
+                       and append them. Falls back to a full download if
+                       the server ignores the ``Range`` header. The
+                       final size and MD5 are verified against the
+                       file's metadata.
+
+        :type chunk_size: int
+        :param chunk_size: (optional) The number of bytes read from the
+                           network and written to disk at a time.
+
+        :type preallocate: bool
+        :param preallocate: (optional) Reserve the file's full size on
+                            disk before writing, where the platform
+                            supports it, to reduce fragmentation. The
+                            file is truncated to the bytes actually
+                            written if the download fails, so it can
+                            still be resumed.
+
+        :type segments: int
+        :param segments: (optional) Split the file into this many byte
+                         ranges and download them concurrently into a
+                         preallocated file. The result is verified
+                         against the size and MD5 in the file's metadata.
+                         Falls back to a single stream if the server
+                         does not support ``Range`` requests, the file's
+                         size is unknown, or a partial download is being
+                         resumed.
+
+        :rtype: int
+        :returns: The number of bytes downloaded, which is less than the
+                  file's size when resuming.
+
+        """
         file_path = self.name if not file_path else file_path
-        if os.path.exists(file_path) and not ignore_existing:
-            raise IOError('File already exists: {0}'.format(file_path))
+        expected_size = int(self.size) if self.size is not None else None
+
+        offset = 0
+        if os.path.exists(file_path):
+            if resume:
+                offset = os.path.getsize(file_path)
+                if expected_size is not None and offset >= expected_size:
+                    if offset == expected_size and self._verify(file_path):
+                        log.info('{0} is already complete'.format(file_path))
+                        return 0
+                    # The local file is corrupt, start over.
+                    offset = 0
+            elif not ignore_existing:
+                raise IOError('File already exists: {0}'.format(file_path))
 
         parent_dir = os.path.dirname(file_path)
         if parent_dir != '' and not os.path.exists(parent_dir):
-            os.makedirs(parent_dir)
-
+            try:
+                os.makedirs(parent_dir)
+            except OSError as e:
+                # Concurrent downloads create the same directories.
+                if e.errno != errno.EEXIST:
+                    raise
+
+        if segments and segments > 1 and expected_size and not offset:
+            if self._download_segments(file_path, segments, chunk_size):
+                self._set_mtime(file_path)
+                if not self._verify(file_path):
+                    raise IOError('Downloaded file does not match the size or MD5 '
+                                  'checksum in the metadata: {0}'.format(file_path))
+                return expected_size
+
+        headers = {}
+        if offset:
+            headers['Range'] = 'bytes={0}-'.format(offset)
         try:
-            response = self._item.http_session.get(self.url, stream=True)
+            response = self._item.http_session.get(self.url, headers=headers,
+                                                   stream=True)
+            if offset and response.status_code == 416:
+                # The requested range starts at the end of the file.
+                log.info('{0} is already complete'.format(file_path))
+                return 0
             response.raise_for_status()
         except HTTPError as e:
             raise HTTPError('Error downloading {0}, {1}'.format(self.url, e))
+
+        if offset and response.status_code != 206:
+            log.warning('{0} ignored the Range header, downloading {1} from the '
+                        'beginning'.format(self.url, file_path))
+            offset = 0
+        elif offset:
+            log.info('resuming download of {0} at byte {1}'.format(file_path, offset))
+
+        # Hash the data as it is written, so verifying a resumed download
+        # only needs to re-read the part that was already on disk.
+        md5 = getattr(self, 'md5', None) if resume else None
+        hasher = hashlib.md5() if md5 else None
+        if hasher and offset:
+            with open(file_path, 'rb') as fp:
+                for chunk in utils.chunk_generator(fp, 1048576):
+                    hasher.update(chunk)
+
+        written = 0
+        mode = 'r+b' if offset else 'wb'
+        with open(file_path, mode) as f:
+            f.seek(offset)
+            if preallocate and expected_size and expected_size > offset:
+                utils.preallocate(f, offset, expected_size - offset)
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        written += len(chunk)
+                        if hasher:
+                            hasher.update(chunk)
+            finally:
+                # Drop any preallocated space that wasn't written to, so a
+                # partial file can be resumed.
+                f.truncate(f.tell())
+
+        self._set_mtime(file_path)
+
+        if resume:
+            size_ok = (expected_size is None
+                       or os.path.getsize(file_path) == expected_size)
+            if not size_ok or (hasher and hasher.hexdigest() != md5):
+                raise IOError('Downloaded file does not match the size or MD5 '
+                              'checksum in the metadata: {0}'.format(file_path))
+        return written
+
+    # _download_segments()
+    #_____________________________________________________________________________________
+    def _download_segments(self, file_path, segments, chunk_size):
+        """Download the file as ``segments`` byte ranges fetched
+        concurrently, each written in place into a preallocated file.
+
+        :rtype: bool
+        :returns: ``False`` if the server does not support ``Range``
+                  requests and nothing was downloaded.
+
+        """
+        http_session = self._item.http_session
+        size = int(self.size)
+        try:
+            probe = http_session.get(self.url, headers={'Range': 'bytes=0-0'},
+                                     stream=True)
+            probe.close()
+            probe.raise_for_status()
+        except HTTPError as e:
+            raise HTTPError('Error downloading {0}, {1}'.format(self.url, e))
+        if probe.status_code != 206:
+            log.info('{0} does not support Range requests, downloading {1} as a '
+                     'single stream'.format(self.url, file_path))
+            return False
+
+        segment_size = -(-size // segments)
+        ranges = [(start, min(start + segment_size, size) - 1)
+                  for start in range(0, size, segment_size)]
+
+        # Set when a segment fails, so the others stop instead of downloading
+        # data that is about to be discarded.
+        stop = threading.Event()
+
+        def fetch_range(start, end):
+            if stop.is_set():
+                return
+            headers = {'Range': 'bytes={0}-{1}'.format(start, end)}
+            response = http_session.get(self.url, headers=headers, stream=True)
+            try:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise IOError('{0} ignored the Range header'.format(self.url))
+                written = 0
+                with open(file_path, 'r+b') as f:
+                    f.seek(start)
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if stop.is_set():
+                            return
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+            finally:
+                response.close()
+            if written != end - start + 1:
+                raise IOError('Incomplete segment {0}-{1} of {2}'.format(start, end,
+                                                                       self.url))
+
         with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-                    f.flush()
+            if not utils.preallocate(f, 0, size):
+                f.truncate(size)
+        # More workers than pooled connections would open and discard
+        # connections.
+        workers = min(len(ranges), self._item.session.http_config['pool_maxsize'])
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = [executor.submit(fetch_range, start, end) for (start, end) in ranges]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except Exception as e:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            # Wait for the running segments to stop before removing the
+            # file they write to.
+            executor.shutdown()
+            # A file with holes can't be resumed, remove it.
+            os.remove(file_path)
+            if isinstance(e, HTTPError):
+                raise HTTPError('Error downloading {0}, {1}'.format(self.url, e))
+            raise
+        executor.shutdown()
+        log.info('downloaded {0} in {1} segments'.format(file_path, len(ranges)))
+        return True
+
+    # _set_mtime()
+    #_____________________________________________________________________________________
+    def _set_mtime(self, file_path):
+        # Match the local mtime to the item's, so later syncs can compare it.
+        if getattr(self, 'mtime', None):
+            mtime = int(float(self.mtime))
+            os.utime(file_path, (mtime, mtime))
+
+    # is_synced()
+    #_____________________________________________________________________________________
+    def is_synced(self, file_path, checksum=False):
+        """Check whether the local file at ``file_path`` is identical to
+        this file, judging by the size and mtime listed in the item's
+        metadata, and optionally by the MD5 checksum.
+
+        :type checksum: bool
+        :param checksum: (optional) Also compare MD5 checksums.
+
+        :rtype: bool
+
+        """
+        if not os.path.isfile(file_path):
+            return False
+        if getattr(self, 'mtime', None):
+            if int(os.path.getmtime(file_path)) != int(float(self.mtime)):
+                return False
+        if checksum:
+            return self._verify(file_path)
+        return self.size is None or os.path.getsize(file_path) == int(self.size)
+
+    # _verify()
+    #_____________________________________________________________________________________
+    def _verify(self, file_path):
+        """Check the local file at ``file_path`` against the size and MD5
+        checksum listed in the item's metadata. Checks that can't be made
+        because the metadata lacks the value are skipped.
+
+        """
+        if self.size is not None and os.path.getsize(file_path) != int(self.size):
+            return False
+        md5 = getattr(self, 'md5', None)
+        if md5:
+            hasher = hashlib.md5()
+            with open(file_path, 'rb') as fp:
+                for chunk in utils.chunk_generator(fp, 1048576):
+                    hasher.update(chunk)
+            if hasher.hexdigest() != md5:
+                return False
+        return True
 
     # delete()
     #_____________________________________________________________________________________
@@ -556,4 +1437,6 @@ class File(object):
             if verbose:
                 sys.stdout.write(' deleting file: {0}\n'.format(self.name))
             prepared_request = request.prepare()
-            return self._item.http_session.send(prepared_request)
+            resp = self._item.http_session.send(prepared_request)
+            self._item._invalidate_metadata_cache()
+            return resp
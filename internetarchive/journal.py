@@ -0,0 +1,113 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+
+log = logging.getLogger(__name__)
+
+
+# UploadJournal class
+#_________________________________________________________________________________________
+class UploadJournal(object):
+    """A local record of the files that were successfully uploaded, so
+    that an interrupted upload can be rerun without sending the same
+    files again.
+
+    Files are recorded by identifier and remote filename, along with the
+    size and mtime of the local file when it was uploaded. A file is
+    only considered uploaded while its size and mtime are unchanged::
+
+        >>> import internetarchive
+        >>> item = internetarchive.Item('identifier', lazy=True)
+        >>> item.upload('directory/', journal='~/.ia-upload.sqlite')
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, path):
+        """
+        :type path: str
+        :param path: The SQLite database to keep the journal in. It is
+                     created if it does not exist.
+
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        # Concurrent uploads record their files from worker threads, the
+        # lock serializes access to the connection.
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS uploads ('
+                ' identifier TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' mtime REAL NOT NULL,'
+                ' md5 TEXT,'
+                ' uploaded REAL NOT NULL,'
+                ' PRIMARY KEY (identifier, key))'
+            )
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'UploadJournal(path={0!r})'.format(self.path)
+
+    # get()
+    #_____________________________________________________________________________________
+    def get(self, identifier, key, path):
+        """Get the journal entry of an uploaded file.
+
+        :type path: str
+        :param path: The local file that is about to be uploaded.
+
+        :rtype: dict
+        :returns: The entry, with the keys ``size``, ``mtime`` and
+                  ``md5``, or ``None`` if the file was not uploaded or
+                  has changed since.
+
+        """
+        st = os.stat(path)
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT size, mtime, md5 FROM uploads WHERE identifier = ? AND key = ?',
+                (identifier, key)).fetchone()
+        if not row or row[0] != st.st_size or row[1] != st.st_mtime:
+            return None
+        return dict(size=row[0], mtime=row[1], md5=row[2])
+
+    # record()
+    #_____________________________________________________________________________________
+    def record(self, identifier, key, path, md5=None, stat=None):
+        """Record that the local file ``path`` was uploaded as ``key``.
+
+        :type stat: :class:`os.stat_result`
+        :param stat: (optional) The status of ``path`` to record, e.g.
+                     taken before uploading a file that is deleted once
+                     uploaded. ``path`` is stat'ed if it isn't given.
+
+        """
+        st = os.stat(path) if stat is None else stat
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)',
+                    (identifier, key, st.st_size, st.st_mtime, md5, time.time()))
+
+    # forget()
+    #_____________________________________________________________________________________
+    def forget(self, identifier, key):
+        """Remove the entry of ``key``, so that it is uploaded again."""
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    'DELETE FROM uploads WHERE identifier = ? AND key = ?',
+                    (identifier, key))
+
+    # close()
+    #_____________________________________________________________________________________
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -1,6 +1,6 @@
 try:
-    from gevent import monkey, queue, spawn
-    from gevent.hub import LoopExit
+    from gevent import monkey, queue, spawn, spawn_later, sleep, killall
+    from gevent.lock import BoundedSemaphore
     monkey.patch_all(thread=False)
 except ImportError:
     raise ImportError(
@@ -12,9 +12,15 @@ except ImportError:
 
     """)
 
-from internetarchive import Item
-from requests.exceptions import RequestException
+import time
+import logging
 
+from internetarchive import Item, session
+from internetarchive.retry import (RetryPolicy, TokenBucket, AdaptiveConcurrency,
+                                   get_retry_after)
+
+
+log = logging.getLogger(__name__)
 
 
 # Mine class
@@ -33,56 +39,137 @@ class Mine(object):
         """
     # __init__()
     #_____________________________________________________________________________________
-    def __init__(self, identifiers, workers=20, max_requests=10):
+    def __init__(self, identifiers, workers=20, max_requests=10, config=None,
+                 archive_session=None, ordered=False, window=1000, retry_policy=None,
+                 rate_limit=None, adaptive=False, checkpoint=None):
         """Makes a generator for an list of `(index, item)` where `item`
         is an instance of `Item` containing metadata, and index is the index,
-        for each id in `identifiers`. Note: this does not return the
-        items in the same order as given in the identifiers list
+        for each id in `identifiers`. Note: unless `ordered` is True, this
+        does not return the items in the same order as given in the
+        identifiers list
         
-        :type identifiers: list
-        :param identifiers: a list of identifiers to get the metadata of
+        :type identifiers: iterable
+        :param identifiers: the identifiers to get the metadata of. Any
+        iterable works, e.g. a generator over the lines of a file, it is
+        consumed lazily and never held in memory as a whole
         :type workers: int
         :param workers: the number of concurrent workers to have fecthing the metadata
         :type max_requests: int or None
         :param max_requests: the number of times to try fetching the metadata,
-        in case there is something wrong with requesting it
+        in case there is something wrong with requesting it. Ignored if
+        `retry_policy` is given
+        :type config: dict
+        :param config: (optional) Configuration options for session.
+        :type archive_session: ArchiveSession
+        :param archive_session: (optional) the session shared by every
+        item fetched. Defaults to a new session whose per-host connection
+        pool is sized to `workers`, so keep-alive connections are reused
+        across items instead of reopened
+        :type ordered: bool
+        :param ordered: (optional) return the items in the same order as
+        the identifiers list. Items fetched ahead of a slower one are held
+        back until it is returned
+        :type window: int
+        :param window: (optional) the maximum number of items being fetched
+        or held back at any time, which bounds memory use regardless of
+        the number of identifiers. A slow item stalls the input once
+        `window` items are waiting behind it
+        :type retry_policy: RetryPolicy
+        :param retry_policy: (optional) which errors are retried, and with
+        which delay. Defaults to retrying connection errors, timeouts, 429
+        and 5xx responses with exponential backoff and jitter, honouring
+        `Retry-After`
+        :type rate_limit: float
+        :param rate_limit: (optional) the maximum number of requests per
+        second, shared by every worker. A `Retry-After` header pauses
+        every worker, with or without a rate limit
+        :type adaptive: bool
+        :param adaptive: (optional) halve the number of active workers when
+        requests fail, and grow it back one at a time as they succeed
+        :type checkpoint: Checkpoint
+        :param checkpoint: (optional) record the index of every identifier
+        processed, and skip the identifiers it already lists. An item is
+        only recorded once the consumer asks for the next one, i.e. once
+        it has been handled
 
         :rtype: Mine
         
         """
+        if archive_session is None:
+            archive_session = session.get_session(config, pool_maxsize=workers)
+        self.session = archive_session
         self.skips = []
+        self._skipped = set()
         self.queue = queue
         self.workers = workers
         self.identifiers = identifiers
-        self.item_count = len(identifiers)
         self.max_requests = max_requests
+        if retry_policy is None:
+            retry_policy = RetryPolicy(max_requests=max_requests)
+        self.retry_policy = retry_policy
+        self.rate_limiter = TokenBucket(rate_limit)
+        self.concurrency = AdaptiveConcurrency(workers) if adaptive else None
+        self.checkpoint = checkpoint
+        self.resumed_count = 0
+        self.ordered = ordered
+        self.window = max(window, workers)
         self.queued_count = 0
         self.got_count = 0
-        self.input_queue = self.queue.JoinableQueue(1000)
-        self.json_queue = self.queue.Queue(1000)
+        self.start_time = None
+        # The window bounds the number of items in both queues, so retries
+        # can always be put back without blocking.
+        self.input_queue = self.queue.JoinableQueue(self.window)
+        self.json_queue = self.queue.Queue(self.window)
+
+
+    # items_per_second
+    #_____________________________________________________________________________________
+    @property
+    def items_per_second(self):
+        """The number of items returned per second since iteration
+        started."""
+        if not self.start_time:
+            return 0.0
+        return self.got_count / max(time.time() - self.start_time, 1e-6)
 
 
     # _metadata_getter()
     #_____________________________________________________________________________________
-    def _metadata_getter(self):
+    def _metadata_getter(self, worker):
         while True:
-            i, identifier, num_requests = self.input_queue.get()
+            # Workers beyond the adaptive concurrency limit stay idle.
+            while self.concurrency and worker >= self.concurrency.limit:
+                sleep(0.1)
+            seq, i, identifier, num_requests = self.input_queue.get()
+            num_requests += 1
             try:
-                item = Item(identifier)
-                self.json_queue.put((i, item))
+                self.rate_limiter.acquire()
+                item = Item(identifier, archive_session=self.session)
+                self.json_queue.put((seq, i, item))
+                if self.concurrency:
+                    self.concurrency.record_success()
             except Exception as e:
-                if (type(e) == RequestException and
-                       (self.max_requests is None or num_requests < self.max_requests)):
-                    self.input_queue.put((i, identifier, num_requests+1))
+                retry = self.retry_policy.should_retry(e, num_requests)
+                if self.concurrency and retry:
+                    self.concurrency.record_error()
+                if retry:
+                    delay = self.retry_policy.get_delay(e, num_requests)
+                    retry_after = get_retry_after(getattr(e, 'response', None))
+                    if retry_after:
+                        # The server is overloaded, hold back every worker.
+                        self.rate_limiter.pause(retry_after)
+                    log.warning('error processing id {0!r}, retrying in {1:.1f}s: '
+                                '{2}'.format(identifier, delay, e))
+                    # Requeue the item later, without blocking this worker.
+                    spawn_later(delay, self.input_queue.put,
+                                (seq, i, identifier, num_requests))
                 else:
-                    if identifier not in self.skips:
+                    if identifier not in self._skipped:
+                        self._skipped.add(identifier)
                         self.skips.append(identifier)
-                    self.item_count -= 1
-                    self.queued_count -= 1
-                    if e.args is not None and len(e.args) > 0 and type(e.args[0]) == str:
-                        e.args = ((e.args[0]+' when processing id '+repr(identifier),) +
-                                  e.args[1:])
-                    raise
+                    log.error('error processing id {0!r}, {1}'.format(identifier, e))
+                    # Let the consumer know this slot will not be filled.
+                    self.json_queue.put((seq, i, None))
             finally:
                 self.input_queue.task_done()
 
@@ -90,10 +177,19 @@ class Mine(object):
     # _queue_input()
     #_____________________________________________________________________________________
     def _queue_input(self):
+        seq = 0
         for i, identifier in enumerate(self.identifiers):
-            if not identifier in self.skips:
-                self.input_queue.put((i, identifier, 0))
+            if self.checkpoint is not None and i in self.checkpoint:
+                self.resumed_count += 1
+                continue
+            if not identifier in self._skipped:
+                # Bound the number of items in flight or held back.
+                self.slots.acquire()
+                self.input_queue.put((seq, i, identifier, 0))
                 self.queued_count += 1
+                seq += 1
+        # Tell the consumer no more items will be queued.
+        self.json_queue.put(None)
 
 
     # __iter__()
@@ -101,16 +197,45 @@ class Mine(object):
     def __iter__(self):
         self.queued_count = 0
         self.got_count = 0
-        spawn(self._queue_input)
-        for i in range(self.workers):
-            spawn(self._metadata_getter)
+        self.resumed_count = 0
+        self.start_time = time.time()
+        self.slots = BoundedSemaphore(self.window)
+        greenlets = [spawn(self._queue_input)]
+        for worker in range(self.workers):
+            greenlets.append(spawn(self._metadata_getter, worker))
 
         def metadata_iterator_helper():
-            while self.queued_count < self.item_count or self.got_count < self.queued_count:
-                self.got_count += 1
-                try:
-                    yield self.json_queue.get()
-                except LoopExit:
-                    raise StopIteration
+            done = 0
+            held_back = {}
+            next_seq = 0
+            input_finished = False
+            try:
+                # The total is unknown until the input sentinel arrives.
+                while not input_finished or done < self.queued_count:
+                    result = self.json_queue.get()
+                    if result is None:
+                        input_finished = True
+                        continue
+                    if not self.ordered:
+                        ready = [result]
+                    else:
+                        held_back[result[0]] = result
+                        ready = []
+                        while next_seq in held_back:
+                            ready.append(held_back.pop(next_seq))
+                            next_seq += 1
+                    for seq, i, item in ready:
+                        done += 1
+                        self.slots.release()
+                        if item is not None:
+                            self.got_count += 1
+                            yield (i, item)
+                        if self.checkpoint is not None:
+                            self.checkpoint.add(i, skipped=item is None)
+            finally:
+                if self.checkpoint is not None:
+                    self.checkpoint.save()
+                # Stop the workers, also when the consumer stops early.
+                killall(greenlets)
 
         return metadata_iterator_helper()
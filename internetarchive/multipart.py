@@ -0,0 +1,326 @@
+import time
+import hashlib
+import logging
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from requests.exceptions import HTTPError, RequestException
+
+from . import iarequest
+
+
+log = logging.getLogger(__name__)
+
+
+# S3's lower bound on the size of every part but the last.
+MIN_PART_SIZE = 5242880
+
+
+# iter_xml_elements()
+#_________________________________________________________________________________________
+def iter_xml_elements(xml, tag):
+    """Generator for iterating over the elements named ``tag`` in an S3
+    XML response, ignoring XML namespaces.
+
+    """
+    root = ElementTree.fromstring(xml)
+    for element in root.iter():
+        if element.tag == tag or element.tag.endswith('}' + tag):
+            yield element
+
+
+# get_xml_text()
+#_________________________________________________________________________________________
+def get_xml_text(element, tag):
+    for child in element:
+        if child.tag == tag or child.tag.endswith('}' + tag):
+            return child.text
+    return None
+
+
+# MultipartUpload class
+#_________________________________________________________________________________________
+class MultipartUpload(object):
+    """This class uploads a single file to an item using the S3
+    multipart upload protocol. The file is sent in parts that are
+    uploaded concurrently and retried individually, and an interrupted
+    upload can be resumed by its upload ID::
+
+        >>> import internetarchive
+        >>> from internetarchive.multipart import MultipartUpload
+        >>> item = internetarchive.Item('identifier', lazy=True)
+        >>> upload = MultipartUpload(item, 'big.tar')
+        >>> upload.upload(open('big.tar', 'rb'))
+
+    """
+    # init()
+    #_____________________________________________________________________________________
+    def __init__(self, item, key, metadata=None, headers=None, access_key=None,
+                 secret_key=None, part_size=67108864, workers=4, retries=3,
+                 upload_id=None):
+        """
+        :type item: :class:`internetarchive.Item <Item>`
+        :param item: The item to upload to.
+
+        :type key: str
+        :param key: The remote filename.
+
+        :type metadata: dict
+        :param metadata: (optional) Metadata used to create a new item.
+
+        :type headers: dict
+        :param headers: (optional) IA-S3 headers sent when initiating the
+                        upload.
+
+        :type part_size: int
+        :param part_size: (optional) The size of each part in bytes. At
+                          most ``workers`` parts are held in memory.
+
+        :type workers: int
+        :param workers: (optional) The number of parts uploaded
+                        concurrently.
+
+        :type retries: int
+        :param retries: (optional) The number of times a failed part is
+                        retried, with exponential backoff.
+
+        :type upload_id: str
+        :param upload_id: (optional) The ID of an in-progress upload to
+                          resume. Parts already uploaded are skipped.
+
+        """
+        self.item = item
+        self.key = key
+        self.metadata = {} if metadata is None else metadata
+        self.headers = {} if headers is None else headers
+        self.access_key = item.session.access_key if not access_key else access_key
+        self.secret_key = item.session.secret_key if not secret_key else secret_key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.workers = workers
+        self.retries = retries
+        self.upload_id = upload_id
+        base_url = '{protocol}//s3.us.archive.org/{identifier}'.format(**item.__dict__)
+        self.url = '{base_url}/{key}'.format(base_url=base_url, key=key)
+        self.parts = {}
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return ('MultipartUpload(identifier={0!r}, key={1!r}, '
+                'upload_id={2!r})'.format(self.item.identifier, self.key,
+                                          self.upload_id))
+
+    # _send()
+    #_____________________________________________________________________________________
+    def _send(self, method, url, headers=None, data=None, metadata=None):
+        request = iarequest.S3Request(
+            method=method,
+            url=url,
+            headers={} if headers is None else headers,
+            data=data,
+            metadata=metadata,
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+        )
+        response = self.item.http_session.send(request.prepare())
+        response.raise_for_status()
+        return response
+
+    # find_upload_id()
+    #_____________________________________________________________________________________
+    def find_upload_id(self):
+        """Look up the ID of the most recent in-progress upload of this
+        key, e.g. to resume it after a crash.
+
+        :rtype: str
+        :returns: The upload ID, or ``None``.
+
+        """
+        url = '{0}?uploads&prefix={1}'.format(self.url.rsplit('/', 1)[0], self.key)
+        response = self._send('GET', url)
+        upload_id = None
+        for upload in iter_xml_elements(response.content, 'Upload'):
+            if get_xml_text(upload, 'Key') == self.key:
+                upload_id = get_xml_text(upload, 'UploadId')
+        return upload_id
+
+    # initiate()
+    #_____________________________________________________________________________________
+    def initiate(self):
+        """Start a new multipart upload.
+
+        :rtype: str
+        :returns: The upload ID.
+
+        """
+        response = self._send('POST', '{0}?uploads'.format(self.url),
+                              headers=dict(self.headers), metadata=self.metadata)
+        for element in iter_xml_elements(response.content, 'UploadId'):
+            self.upload_id = element.text
+        log.info('initiated multipart upload of {0}, upload ID: {1}'.format(
+            self.key, self.upload_id))
+        return self.upload_id
+
+    # list_parts()
+    #_____________________________________________________________________________________
+    def list_parts(self):
+        """Get the parts already uploaded for this upload.
+
+        :rtype: dict
+        :returns: The ETag of each uploaded part, keyed by part number.
+
+        """
+        parts = {}
+        marker = 0
+        while True:
+            url = '{0}?uploadId={1}&part-number-marker={2}'.format(self.url,
+                                                                  self.upload_id, marker)
+            response = self._send('GET', url)
+            for part in iter_xml_elements(response.content, 'Part'):
+                part_number = int(get_xml_text(part, 'PartNumber'))
+                parts[part_number] = get_xml_text(part, 'ETag').strip('"')
+                marker = max(marker, part_number)
+            truncated = list(iter_xml_elements(response.content, 'IsTruncated'))
+            if not truncated or truncated[0].text != 'true':
+                return parts
+
+    # upload_part()
+    #_____________________________________________________________________________________
+    def upload_part(self, part_number, data, md5=None):
+        """Upload a single part, retrying with exponential backoff on
+        connection errors and server errors.
+
+        :rtype: str
+        :returns: The part's ETag.
+
+        """
+        md5 = hashlib.md5(data).hexdigest() if md5 is None else md5
+        url = '{0}?partNumber={1}&uploadId={2}'.format(self.url, part_number,
+                                                      self.upload_id)
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._send('PUT', url, headers={'Content-MD5': md5},
+                                      data=data)
+                etag = response.headers.get('etag', md5).strip('"')
+                self.parts[part_number] = etag
+                return etag
+            except RequestException as e:
+                status = getattr(e.response, 'status_code', None)
+                retryable = status is None or status >= 500
+                if not retryable or attempt == self.retries:
+                    raise
+                delay = 2 ** attempt
+                log.warning('error uploading part {0} of {1}, retrying in {2}s: '
+                            '{3}'.format(part_number, self.key, delay, e))
+                time.sleep(delay)
+
+    # complete()
+    #_____________________________________________________________________________________
+    def complete(self):
+        """Assemble the uploaded parts into the final file.
+
+        :rtype: :class:`requests.Response`
+
+        """
+        xml = ['<CompleteMultipartUpload>']
+        for part_number in sorted(self.parts):
+            xml.append('<Part><PartNumber>{0}</PartNumber><ETag>"{1}"</ETag>'
+                       '</Part>'.format(part_number, self.parts[part_number]))
+        xml.append('</CompleteMultipartUpload>')
+        url = '{0}?uploadId={1}'.format(self.url, self.upload_id)
+        response = self._send('POST', url, data=''.join(xml))
+        # S3 can report errors in the body of a 200 response. Give the
+        # response an error status, so that it isn't mistaken for a
+        # success by callers that only check the status.
+        if list(iter_xml_elements(response.content, 'Error')):
+            response.status_code = 500
+            raise HTTPError('error completing multipart upload of {0}: '
+                            '{1}'.format(self.key, response.content), response=response)
+        log.info('completed multipart upload of {0} in {1} parts'.format(
+            self.key, len(self.parts)))
+        return response
+
+    # abort()
+    #_____________________________________________________________________________________
+    def abort(self):
+        """Abort the upload, discarding any uploaded parts."""
+        url = '{0}?uploadId={1}'.format(self.url, self.upload_id)
+        response = self._send('DELETE', url)
+        log.info('aborted multipart upload {0} of {1}'.format(self.upload_id, self.key))
+        return response
+
+    # iter_parts()
+    #_____________________________________________________________________________________
+    def iter_parts(self, body):
+        """Generator for iterating over ``(part_number, data)`` tuples
+        read sequentially from ``body``, which doesn't need to be
+        seekable.
+
+        """
+        part_number = 1
+        while True:
+            # Pipes and sockets can return fewer bytes than requested, but
+            # every part except the last must be at least MIN_PART_SIZE.
+            chunks = []
+            remaining = self.part_size
+            while remaining:
+                chunk = body.read(remaining)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            if not chunks:
+                break
+            yield part_number, b''.join(chunks)
+            part_number += 1
+
+    # upload()
+    #_____________________________________________________________________________________
+    def upload(self, body):
+        """Upload ``body`` and complete the upload. If this upload has an
+        ``upload_id``, parts that were already uploaded with the same
+        content are skipped.
+
+        On failure, the upload is left in progress so that it can be
+        resumed; call :meth:`abort` to discard it instead.
+
+        :type body: file-like object
+        :param body: The data to upload, read sequentially.
+
+        :rtype: :class:`requests.Response`
+        :returns: The response to the completion request.
+
+        """
+        if self.upload_id:
+            uploaded = self.list_parts()
+            log.info('resuming multipart upload {0} of {1}, {2} parts already '
+                     'uploaded'.format(self.upload_id, self.key, len(uploaded)))
+        else:
+            uploaded = {}
+            self.initiate()
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = set()
+        try:
+            for part_number, data in self.iter_parts(body):
+                md5 = hashlib.md5(data).hexdigest()
+                if uploaded.get(part_number) == md5:
+                    self.parts[part_number] = md5
+                    continue
+                # Bound the number of parts held in memory.
+                while len(pending) >= self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(self.upload_part, part_number, data, md5))
+            for future in pending:
+                future.result()
+        except:
+            log.error('multipart upload {0} of {1} failed, resume it with '
+                      'upload_id={0!r}'.format(self.upload_id, self.key))
+            for future in pending:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown()
+        return self.complete()
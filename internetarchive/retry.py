@@ -0,0 +1,240 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_tz, mktime_tz
+
+from requests.exceptions import RequestException
+
+
+log = logging.getLogger(__name__)
+
+
+# get_retry_after()
+#_________________________________________________________________________________________
+def get_retry_after(response):
+    """Get the number of seconds to wait from the ``Retry-After`` header
+    of ``response``, given either in seconds or as an HTTP date.
+
+    :rtype: float
+    :returns: The delay in seconds, or ``None`` if there is no valid
+              header.
+
+    """
+    value = getattr(response, 'headers', {}).get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(mktime_tz(date) - time.time(), 0.0)
+
+
+# RetryPolicy class
+#_________________________________________________________________________________________
+class RetryPolicy(object):
+    """Decides whether a failed request is retried, and how long to wait
+    before retrying it.
+
+    Connection errors, timeouts and responses with a status in
+    ``retry_statuses`` are retried, up to ``max_requests`` requests in
+    total. The delay grows exponentially with every attempt, with jitter
+    so that concurrent clients don't retry in lockstep, and the
+    ``Retry-After`` header of 429 and 503 responses is honoured.
+
+    Usage::
+
+        >>> from internetarchive.mine import Mine
+        >>> from internetarchive.retry import RetryPolicy
+        >>> policy = RetryPolicy(max_requests=5, backoff=1)
+        >>> miner = Mine(['identifier1', 'identifier2'], retry_policy=policy)
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, max_requests=10, backoff=0.5, max_backoff=60,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        """
+        :type max_requests: int or None
+        :param max_requests: (optional) The maximum number of requests,
+                             including the first one. ``None`` retries
+                             forever.
+
+        :type backoff: float
+        :param backoff: (optional) The delay before the first retry in
+                        seconds, doubled for every further retry.
+
+        :type max_backoff: float
+        :param max_backoff: (optional) The maximum delay in seconds, unless
+                            the server asks for longer with
+                            ``Retry-After``.
+
+        :type retry_statuses: tuple
+        :param retry_statuses: (optional) The HTTP status codes to retry.
+
+        """
+        self.max_requests = max_requests
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'RetryPolicy(max_requests={0!r}, backoff={1!r}, max_backoff={2!r})'.format(
+            self.max_requests, self.backoff, self.max_backoff)
+
+    # should_retry()
+    #_____________________________________________________________________________________
+    def should_retry(self, error, num_requests):
+        """Return ``True`` if a request that failed with ``error`` after
+        ``num_requests`` requests should be retried.
+
+        """
+        if self.max_requests is not None and num_requests >= self.max_requests:
+            return False
+        if not isinstance(error, RequestException):
+            return False
+        status_code = getattr(error.response, 'status_code', None)
+        return status_code is None or status_code in self.retry_statuses
+
+    # get_delay()
+    #_____________________________________________________________________________________
+    def get_delay(self, error, num_requests):
+        """Get the number of seconds to wait before the next request."""
+        response = getattr(error, 'response', None)
+        if getattr(response, 'status_code', None) in (429, 503):
+            retry_after = get_retry_after(response)
+            if retry_after is not None:
+                return retry_after
+        delay = min(self.backoff * 2 ** (num_requests - 1), self.max_backoff)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+# TokenBucket class
+#_________________________________________________________________________________________
+class TokenBucket(object):
+    """A rate limiter shared by concurrent workers, allowing ``rate``
+    requests per second on average with bursts of up to ``burst``
+    requests. It can also be paused, e.g. when the server responds with
+    ``Retry-After``, which holds back every worker.
+
+    It is safe to use from threads and greenlets, the lock is never held
+    while waiting.
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, rate=None, burst=None):
+        """
+        :type rate: float
+        :param rate: (optional) The number of requests per second.
+                     ``None`` doesn't limit the rate, the bucket can still
+                     be paused.
+
+        :type burst: int
+        :param burst: (optional) The number of requests that can be made
+                      at once after a quiet period. Defaults to ``rate``.
+
+        """
+        self.rate = float(rate) if rate else None
+        self.capacity = float(burst or max(self.rate or 1, 1))
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.paused_until = 0
+        self._lock = threading.Lock()
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'TokenBucket(rate={0!r}, burst={1!r})'.format(self.rate, self.capacity)
+
+    # acquire()
+    #_____________________________________________________________________________________
+    def acquire(self):
+        """Wait until a request may be made."""
+        with self._lock:
+            now = time.time()
+            wait = self.paused_until - now
+            if self.rate:
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Reserve a token now and wait for it outside of the lock;
+                # a negative balance queues up the workers behind it.
+                self.tokens -= 1
+                wait = max(wait, -self.tokens / self.rate)
+        if wait > 0:
+            time.sleep(wait)
+
+    # pause()
+    #_____________________________________________________________________________________
+    def pause(self, seconds):
+        """Hold back every request for ``seconds``."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+        log.info('pausing requests for {0:.1f}s'.format(seconds))
+
+
+# AdaptiveConcurrency class
+#_________________________________________________________________________________________
+class AdaptiveConcurrency(object):
+    """Adjusts the number of concurrent requests to the error rate, by
+    additive increase and multiplicative decrease: the limit is halved on
+    errors, and grows by one after a full limit's worth of consecutive
+    successes, up to ``maximum``.
+
+    Errors from requests that were already in flight when the limit was
+    lowered don't lower it again.
+
+    """
+    # __init__()
+    #_____________________________________________________________________________________
+    def __init__(self, maximum, minimum=1):
+        """
+        :type maximum: int
+        :param maximum: The initial and maximum limit.
+
+        :type minimum: int
+        :param minimum: (optional) The minimum limit.
+
+        """
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = maximum
+        self._successes = 0
+        self._since_decrease = maximum
+        self._lock = threading.Lock()
+
+    # __repr__()
+    #_____________________________________________________________________________________
+    def __repr__(self):
+        return 'AdaptiveConcurrency(limit={0!r}, maximum={1!r})'.format(self.limit,
+                                                                       self.maximum)
+
+    # record_success()
+    #_____________________________________________________________________________________
+    def record_success(self):
+        with self._lock:
+            self._since_decrease += 1
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+
+    # record_error()
+    #_____________________________________________________________________________________
+    def record_error(self):
+        with self._lock:
+            self._since_decrease += 1
+            self._successes = 0
+            if self._since_decrease < self.limit:
+                return
+            limit = max(self.limit // 2, self.minimum)
+            if limit < self.limit:
+                log.info('lowering concurrency from {0} to {1}'.format(self.limit, limit))
+            self.limit = limit
+            self._since_decrease = 0
@@ -1,6 +1,15 @@
-import requests.sessions
+try:
+    import ujson as json
+except ImportError:
+    import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from . import session
+import six
+from requests.exceptions import HTTPError
+
+from . import session, utils
 
 
 # Search class
@@ -17,41 +26,220 @@ class Search(object):
         >>> for result in search:
         ...     print(result['identifier'])
 
+    With ``scrape=True``, results are paged through with the cursors of
+    the scrape API rather than page numbers, which keeps the cost of
+    every page constant no matter how deep into the results it is, and
+    allows up to 10,000 results per request. Use it to export large
+    result sets.
+
+    With ``prefetch``, the next pages are requested while the current
+    one is being iterated over, so that network round trips overlap with
+    the caller's work.
+
+    With ``stream``, results are decoded and returned as they are
+    received rather than once the whole page has been downloaded, so that
+    memory use doesn't grow with the page size.
+
+    If the session has a search cache, configured in the ``cache`` section
+    of the config file, pages of results are cached on disk, keyed by the
+    query's parameters. A search is answered from the cache without
+    requests once all of its pages have been cached, for as long as they
+    are fresh. Stale or incomplete results are fetched again as a whole.
+    Pages written to the cache are decoded whole, regardless of
+    ``stream``.
+
     """
     # init()
     #_____________________________________________________________________________________
-    def __init__(self, query, fields=['identifier'], params={}, config=None):
-        self.session = session.ArchiveSession(config)
-        self.http_session = requests.sessions.Session()
+    def __init__(self, query, fields=['identifier'], params={}, config=None,
+                 archive_session=None, scrape=False, page_size=None, prefetch=0,
+                 stream=False):
+        """
+        :type query: str
+        :param query: The search query.
+
+        :type fields: list
+        :param fields: (optional) The metadata fields to return.
+
+        :type params: dict
+        :param params: (optional) Advanced search parameters, e.g.
+                       ``{'sort[0]': 'date desc'}``.
+
+        :type scrape: bool
+        :param scrape: (optional) Iterate over the results with the
+                       cursor-based scrape API.
+
+        :type page_size: int
+        :param page_size: (optional) The number of results per request.
+                          Defaults to 100, or 10,000 (the maximum) with
+                          ``scrape``.
+
+        :type prefetch: int
+        :param prefetch: (optional) The number of pages to fetch ahead of
+                         the page being iterated over. Pages are fetched
+                         concurrently, except with ``scrape``, where every
+                         request needs the cursor of the previous page, so
+                         pages are fetched one after another in the
+                         background. Results are always returned in order.
+
+        :type stream: bool
+        :param stream: (optional) Decode every response incrementally,
+                       returning results as they are received.
+
+        """
+        if archive_session is None:
+            if config:
+                archive_session = session.get_session(config)
+            else:
+                archive_session = session.get_default_session()
+        self.session = archive_session
+        self.http_session = self.session.http_session
         self.url = 'http://archive.org/advancedsearch.php'
+        protocol = 'https:' if self.session.secure else 'http:'
+        self.scrape_url = '{0}//archive.org/services/search/v1/scrape'.format(protocol)
+        self.fields = fields
+        self.scrape = scrape
+        self.prefetch = prefetch
+        self.stream = stream
         default_params = dict(
             q=query,
             rows=100,
         )
         self.params = default_params.copy()
         self.params.update(params)
+        if page_size and not scrape:
+            self.params['rows'] = page_size
+        self.page_size = page_size or (10000 if scrape else self.params['rows'])
         if not self.params.get('output'):
             self.params['output'] = 'json'
 
         for k, v in enumerate(fields):
             key = 'fl[{0}]'.format(k)
             self.params[key] = v
-        self._search_info = self._get_search_info()
-        self.num_found = self._search_info['response']['numFound']
-        self.query = self._search_info['responseHeader']['params']['q']
+        self.query = self.params['q']
+        # The number of results is only requested when it is needed, and
+        # is taken from the first page when iterating.
+        self._num_found = None
+
+        self.cache = self.session.search_cache
+        self._cache_key = self._get_cache_key()
+        # Every fetch of the results is cached under a new generation, and
+        # only used once all of its pages are cached.
+        self._generation = None
+        # The number of pages of the cached results, if they are used.
+        self._cached_pages = None
 
     # __repr__()
     #_____________________________________________________________________________________
     def __repr__(self):
-        return ('Search(query={query!r}, '
-                'num_found={num_found!r})'.format(**self.__dict__))
+        # Don't send a request just to show the number of results.
+        return 'Search(query={0!r}, num_found={1!r})'.format(self.query, self._num_found)
+
+    # num_found
+    #_____________________________________________________________________________________
+    @property
+    def num_found(self):
+        """The number of results, requested with a count-only query
+        unless iteration has already started."""
+        if self._num_found is None and self.cache:
+            self._start_cache()
+        if self._num_found is None:
+            self._num_found = self._get_search_info()['response']['numFound']
+        return self._num_found
+
+    # _get_cache_key()
+    #_____________________________________________________________________________________
+    def _get_cache_key(self):
+        if self.scrape:
+            url, params = self.scrape_url, self._get_scrape_params()
+        else:
+            url, params = self.url, self.params
+        # Values are compared as strings, so that e.g. rows=100 and
+        # rows='100' share cache entries.
+        params = sorted((k, six.text_type(v)) for (k, v) in params.items()
+                        if k not in ('page', 'cursor'))
+        return '{0}?{1}'.format(url, json.dumps(params))
+
+    # _start_cache()
+    #_____________________________________________________________________________________
+    def _start_cache(self):
+        """Decide whether the search is answered from the cache.
+
+        Cached results are only used while they are fresh and every one
+        of their pages is still cached, otherwise they are dropped and
+        all pages are fetched again under a new generation, so that
+        results of different fetches are never mixed.
+
+        """
+        if self._generation is not None:
+            return
+        entry = self.cache.get(self._cache_key)
+        if entry:
+            header = entry['value']
+            # Headers cached by earlier versions don't list their pages.
+            pages = header.get('pages')
+            # Checking the pages also marks them as recently used, so that
+            # they aren't evicted while they are read.
+            if (pages is not None and self.cache.is_fresh(entry)
+                    and all(self.cache.contains(self._get_page_key(p, header['generation']))
+                            for p in range(1, pages + 1))):
+                self._generation = header['generation']
+                self._num_found = header['num_found']
+                self._cached_pages = pages
+                return
+            self._drop_cache(header['generation'], pages or 0)
+        self._generation = repr(time.time())
+
+    # _drop_cache()
+    #_____________________________________________________________________________________
+    def _drop_cache(self, generation, pages):
+        self.cache.delete(self._cache_key)
+        for page in range(1, pages + 1):
+            self.cache.delete(self._get_page_key(page, generation))
+
+    # _get_page_key()
+    #_____________________________________________________________________________________
+    def _get_page_key(self, page, generation=None):
+        return '{0}#{1}#{2}'.format(self._cache_key, generation or self._generation, page)
+
+    # _get_cached_page()
+    #_____________________________________________________________________________________
+    def _get_cached_page(self, page):
+        """Get the cache entry of ``page``, or ``None`` if the search isn't
+        answered from the cache."""
+        if self._cached_pages is None:
+            return None
+        entry = self.cache.get(self._get_page_key(page))
+        if not entry:
+            # Fetching the page now would mix results of different fetches.
+            self._drop_cache(self._generation, self._cached_pages)
+            raise IOError('cached results of {0} were evicted while being read, '
+                          'search again to fetch them.'.format(self.query))
+        self.cache.count('hits')
+        return entry
+
+    # _set_cached_page()
+    #_____________________________________________________________________________________
+    def _set_cached_page(self, page, docs, **info):
+        self.cache.count('misses')
+        self.cache.set(self._get_page_key(page), docs, **info)
+
+    # _set_cached_header()
+    #_____________________________________________________________________________________
+    def _set_cached_header(self, pages):
+        """Store the header entry of the search once all of its ``pages``
+        are cached, which makes them usable."""
+        if self.cache and self._cached_pages is None:
+            header = dict(num_found=self._num_found, generation=self._generation,
+                          pages=pages)
+            self.cache.set(self._cache_key, header)
 
     # _get_search_info()
     #_____________________________________________________________________________________
     def _get_search_info(self):
         info_params = self.params.copy()
         info_params['rows'] = 0
-        r = self.http_session.get(self.url, params=self.params)
+        r = self.http_session.get(self.url, params=info_params)
         results = r.json()
         del results['response']['docs']
         return results
@@ -60,10 +248,154 @@ class Search(object):
     #_____________________________________________________________________________________
     def __iter__(self):
         """Generator for iterating over search results"""
-        total_pages = ((self.num_found / self.params['rows']) + 2)
-        for page in range(1, total_pages):
-            self.params['page'] = page
-            r = self.http_session.get(self.url, params=self.params)
-            results = r.json()
-            for doc in results['response']['docs']:
+        if self.cache:
+            self._start_cache()
+        if not self.scrape:
+            pages = self._iter_pages()
+            return (doc for docs in pages for doc in docs)
+        pages = self._iter_scrape_pages()
+        if self.prefetch and not self.stream:
+            pages = utils.iter_prefetched(pages, self.prefetch)
+        docs = (doc for docs in pages for doc in docs)
+        if self.prefetch and self.stream:
+            # Streamed pages have to be read to the end to get the cursor of
+            # the next one, so results are prefetched rather than pages.
+            docs = utils.iter_prefetched(docs, self.prefetch * self.page_size)
+        return docs
+
+    # _iter_streamed()
+    #_____________________________________________________________________________________
+    def _iter_streamed(self, r, key, envelope):
+        """Generator yielding the elements of the array ``key`` of a
+        streamed response as they are received. ``envelope`` is updated
+        with the rest of the response."""
+        try:
+            for doc in utils.iter_json_array(r.iter_content(65536), key, envelope):
+                yield doc
+        finally:
+            r.close()
+
+    # _iter_page_docs()
+    #_____________________________________________________________________________________
+    def _iter_page_docs(self, r):
+        envelope = {}
+        try:
+            for doc in self._iter_streamed(r, 'docs', envelope):
                 yield doc
+        finally:
+            if self._num_found is None and 'response' in envelope:
+                self._num_found = envelope['response']['numFound']
+
+    # _get_page()
+    #_____________________________________________________________________________________
+    def _get_page(self, page):
+        entry = self._get_cached_page(page)
+        if entry:
+            return entry['value']
+        # self.params is shared by concurrent requests, so it's copied.
+        params = dict(self.params, page=page)
+        stream = self.stream and not self.cache
+        r = self.http_session.get(self.url, params=params, stream=stream)
+        if stream:
+            return self._iter_page_docs(r)
+        results = r.json()
+        if self._num_found is None:
+            self._num_found = results['response']['numFound']
+        if self.cache:
+            self._set_cached_page(page, results['response']['docs'])
+        return results['response']['docs']
+
+    # _iter_pages()
+    #_____________________________________________________________________________________
+    def _iter_pages(self):
+        """Generator yielding the list of documents of every page."""
+        first_page = 1
+        if self._num_found is None:
+            # The first page tells how many pages there are.
+            yield self._get_page(1)
+            first_page = 2
+        rows = int(self.params['rows'])
+        total_pages = -(-self._num_found // rows) if rows else 0
+        pages = range(first_page, total_pages + 1)
+        if not self.prefetch:
+            for page in pages:
+                yield self._get_page(page)
+            self._set_cached_header(max(total_pages, first_page - 1))
+            return
+
+        # At most ``prefetch`` pages are requested or held ahead of the
+        # page being iterated over.
+        executor = ThreadPoolExecutor(max_workers=self.prefetch)
+        futures = deque()
+        try:
+            for page in pages:
+                futures.append(executor.submit(self._get_page, page))
+                if len(futures) > self.prefetch:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        self._set_cached_header(max(total_pages, first_page - 1))
+
+    # _get_scrape_params()
+    #_____________________________________________________________________________________
+    def _get_scrape_params(self):
+        params = dict(
+            q=self.params['q'],
+            fields=','.join(self.fields),
+            count=self.page_size,
+        )
+        sort_keys = sorted((k for k in self.params if k.startswith('sort[')),
+                           key=lambda k: int(k[5:-1]))
+        if sort_keys:
+            params['sorts'] = ','.join(self.params[k] for k in sort_keys)
+        return params
+
+    # _iter_scrape_pages()
+    #_____________________________________________________________________________________
+    def _iter_scrape_pages(self):
+        """Generator yielding the list of documents of every page of
+        the scrape API."""
+        params = self._get_scrape_params()
+        stream = self.stream and not self.cache
+        page = 1
+        while True:
+            entry = self._get_cached_page(page)
+            if entry:
+                cursor = entry.get('cursor')
+                yield entry['value']
+            else:
+                r = self.http_session.get(self.scrape_url, params=params, stream=stream)
+                r.raise_for_status()
+                if stream:
+                    # The cursor follows the items, it is only known once the
+                    # page has been iterated over.
+                    results = {}
+                    yield self._iter_streamed(r, 'items', results)
+                    self._check_scrape_results(r, results)
+                else:
+                    results = r.json()
+                    self._check_scrape_results(r, results)
+                    if self.cache:
+                        self._set_cached_page(page, results.get('items', []),
+                                              cursor=results.get('cursor'))
+                    yield results.get('items', [])
+                cursor = results.get('cursor')
+            # The last page has no cursor.
+            if not cursor:
+                self._set_cached_header(page)
+                break
+            params['cursor'] = cursor
+            page += 1
+
+    # _check_scrape_results()
+    #_____________________________________________________________________________________
+    def _check_scrape_results(self, r, results):
+        if results.get('error'):
+            raise HTTPError('Error searching {0}, {1}'.format(r.url, results['error']),
+                            response=r)
+        if self._num_found is None and 'total' in results:
+            self._num_found = results['total']
@@ -1,10 +1,13 @@
 import os
 import logging
+import threading
 
 import requests.sessions
 import requests.cookies
+import requests.adapters
 
 import internetarchive.config
+import internetarchive.cache
 import internetarchive.item
 
 
@@ -21,9 +24,41 @@ class ArchiveSession(object):
 
     FmtString = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
+    # Default connection pool settings, overridable via the ``http``
+    # section of the config file.
+    http_defaults = dict(
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        max_retries=0,
+    )
+
     # __init__()
     #_____________________________________________________________________________________
-    def __init__(self, config=None):
+    def __init__(self, config=None, pool_connections=None, pool_maxsize=None,
+                 pool_block=None, max_retries=None):
+        """
+        :type config: dict
+        :param config: (optional) Configuration options for session.
+
+        :type pool_connections: int
+        :param pool_connections: (optional) The number of per-host
+                                 connection pools to cache.
+
+        :type pool_maxsize: int
+        :param pool_maxsize: (optional) The maximum number of keep-alive
+                             connections kept open per host.
+
+        :type pool_block: bool
+        :param pool_block: (optional) Block when no free connection is
+                           available for a host instead of opening a
+                           throwaway connection.
+
+        :type max_retries: int
+        :param max_retries: (optional) The number of times to retry
+                            failed connections.
+
+        """
         super(ArchiveSession, self).__init__()
         config = internetarchive.config.get_config(config)
         self.cookies = requests.cookies.cookiejar_from_dict(config.get('cookies', {}))
@@ -45,7 +80,43 @@ class ArchiveSession(object):
             log_file = 'internetarchive.log'
             self.set_file_logger(_level, log_file)
 
-    # __init__()
+        http_config = self.http_defaults.copy()
+        http_config.update(config.get('http', {}))
+        for key, value in [('pool_connections', pool_connections),
+                           ('pool_maxsize', pool_maxsize),
+                           ('pool_block', pool_block),
+                           ('max_retries', max_retries)]:
+            if value is not None:
+                http_config[key] = value
+        self.http_config = http_config
+        self.http_session = self._get_http_session()
+
+        # Persistent Metadata API cache, enabled via the ``cache`` section
+        # of the config file.
+        self.metadata_cache = internetarchive.cache.get_cache('metadata', config)
+        # Search results cache, see :class:`Search <Search>`.
+        self.search_cache = internetarchive.cache.get_cache('search', config)
+
+    # _get_http_session()
+    #_____________________________________________________________________________________
+    def _get_http_session(self):
+        """Build the pooled, keep-alive :class:`requests.Session` shared
+        by every object created with this session.
+
+        """
+        http_session = requests.sessions.Session()
+        http_session.cookies = self.cookies
+        for prefix in ['http://', 'https://']:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.http_config['pool_connections'],
+                pool_maxsize=self.http_config['pool_maxsize'],
+                pool_block=self.http_config['pool_block'],
+                max_retries=self.http_config['max_retries'],
+            )
+            http_session.mount(prefix, adapter)
+        return http_session
+
+    # set_file_logger()
     #_____________________________________________________________________________________
     def set_file_logger(self, log_level, path, logger_name='internetarchive'):
         """Convenience function to quickly configure any level of
@@ -68,9 +139,27 @@ class ArchiveSession(object):
         log.addHandler(fh)
 
 
-def get_session(config=None):
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_session(config=None, **kwargs):
     """
     Return a new ArchiveSession object
 
     """
-    return ArchiveSession(config)
+    return ArchiveSession(config, **kwargs)
+
+
+def get_default_session():
+    """
+    Return the process-wide ArchiveSession object, creating it on first
+    use. The config file is only read once, and every object using this
+    session shares the same pool of keep-alive connections.
+
+    """
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = ArchiveSession()
+    return _default_session
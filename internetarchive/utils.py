@@ -1,5 +1,11 @@
+import codecs
 import hashlib
+import json
 import os
+import re
+import threading
+
+from six.moves import queue
 
 
 def get_md5(file_object):
@@ -12,6 +18,39 @@ def get_md5(file_object):
     file_object.seek(0, os.SEEK_SET) 
     return m.hexdigest()
 
+def load_md5_manifest(path):
+    """Read a checksum manifest in the format written by ``md5sum``,
+    i.e. ``<md5>  <path>`` lines, into a dict keyed by path. Each
+    checksum is also listed under the path's basename.
+
+    """
+    manifest = {}
+    with open(path) as fp:
+        for line in fp:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            md5, filepath = line.split(None, 1)
+            filepath = os.path.normpath(filepath.lstrip('*'))
+            manifest[filepath] = md5.lower()
+            manifest.setdefault(os.path.basename(filepath), md5.lower())
+    return manifest
+
+def preallocate(fp, offset, length):
+    """Reserve ``length`` bytes of disk space for ``fp`` starting at
+    ``offset``. Returns ``False`` if the platform or filesystem does not
+    support preallocation.
+
+    """
+    if not hasattr(os, 'posix_fallocate'):
+        return False
+    fp.flush()
+    try:
+        os.posix_fallocate(fp.fileno(), offset, length)
+    except OSError:
+        return False
+    return True
+
 def chunk_generator(fp, chunk_size):
     while True:
         chunk = fp.read(chunk_size)
@@ -19,13 +58,248 @@ def chunk_generator(fp, chunk_size):
             break
         yield chunk
 
+class HashingReader(object):
+    """File-like wrapper computing the MD5 checksum of the data read
+    through it, so a file can be hashed while it is being uploaded.
+
+    """
+    def __init__(self, fp, size=None):
+        self.fp = fp
+        self.name = getattr(fp, 'name', None)
+        self.length = size
+        self._md5 = hashlib.md5()
+
+    def read(self, size=-1):
+        data = self.fp.read(size)
+        self._md5.update(data)
+        return data
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+    def __len__(self):
+        return self.length
+
 class IterableToFileAdapter(object):
+    """File-like wrapper around an iterable of byte strings, e.g. a
+    progress bar over :func:`chunk_generator`, so that it can be used as
+    a request body.
+
+    ``read(size)`` returns exactly ``size`` bytes until the iterable is
+    exhausted, regardless of how the iterable is chunked. Reads within a
+    chunk are sliced from a memoryview of it, reads spanning chunks are
+    assembled in a buffer that is reused across calls, and
+    :meth:`readinto` copies straight into the caller's buffer.
+
+    """
     def __init__(self, iterable, size):
         self.iterator = iter(iterable)
         self.length = size
+        self._chunk = None
+        self._view = memoryview(b'')
+        self._buffer = None
+
+    def _next_chunk(self):
+        for chunk in self.iterator:
+            if chunk:
+                self._chunk = chunk
+                self._view = memoryview(chunk)
+                return True
+        self._chunk = None
+        return False
+
+    def readinto(self, b):
+        target = memoryview(b)
+        count = 0
+        while count < len(target):
+            if not len(self._view) and not self._next_chunk():
+                break
+            n = min(len(target) - count, len(self._view))
+            target[count:count + n] = self._view[:n]
+            self._view = self._view[n:]
+            count += n
+        return count
 
-    def read(self, size=-1): # TBD: add buffer for `len(data) > size` case
-        return next(self.iterator, b'')
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = b''.join([self._view.tobytes()] + list(self.iterator))
+            self._view = memoryview(b'')
+            return data
+        if not len(self._view) and not self._next_chunk():
+            return b''
+        # A whole chunk is returned as is, without copying it.
+        if size == len(self._view) == len(self._chunk):
+            self._view = memoryview(b'')
+            return self._chunk
+        if size <= len(self._view):
+            data = self._view[:size].tobytes()
+            self._view = self._view[size:]
+            return data
+        if self._buffer is None or len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        count = self.readinto(memoryview(self._buffer)[:size])
+        return memoryview(self._buffer)[:count].tobytes()
 
     def __len__(self):
         return self.length
+
+def iter_prefetched(iterable, size):
+    """Generator yielding the items of ``iterable``, which is consumed in
+    a background thread at most ``size`` items ahead of the caller, e.g.
+    to fetch the next pages of results while the current one is being
+    processed. Exceptions are re-raised in the caller's thread.
+
+    """
+    buffer = queue.Queue(size)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        # Give up once the caller has stopped iterating.
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is end:
+                break
+            yield item
+    finally:
+        stop.set()
+
+_JSON_TOKEN = re.compile(r'["\\{}\[\]]')
+_JSON_STRING_TOKEN = re.compile(r'["\\]')
+_JSON_WHITESPACE = re.compile(r'\s*')
+_JSON_SEPARATOR = re.compile(r'[\s,]*')
+
+def iter_json_array(chunks, key, envelope=None):
+    """Generator decoding the elements of the array named ``key`` in a
+    JSON document received as an iterable of UTF-8 byte strings, e.g.
+    ``response.iter_content()``. Elements are yielded as soon as they
+    have been received, so the document is never held in memory as a
+    whole.
+
+    If ``envelope`` is given, it is updated with the rest of the document,
+    with an empty list in place of the array: with the part preceding the
+    array as soon as it has been received, then with the whole document
+    once the array has been read. If the document has no such array,
+    nothing is yielded and ``envelope`` is updated with the document.
+
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+
+    def read():
+        for chunk in chunks:
+            text = decode(chunk)
+            if text:
+                return text
+        return decode(b'', True) or None
+
+    # Find the array, keeping track of the brackets that are open, so
+    # that the part of the document preceding it can be closed and parsed.
+    buf = ''
+    pos = 0
+    in_string = False
+    string_start = None
+    closers = []
+    array_start = None
+    while array_start is None:
+        token = _JSON_STRING_TOKEN if in_string else _JSON_TOKEN
+        match = token.search(buf, pos)
+        if match and in_string and match.group() == '\\':
+            if match.end() < len(buf):
+                pos = match.end() + 1
+                continue
+            pos = match.start()
+        elif match and in_string:
+            in_string = False
+            pos = match.end()
+            if buf[string_start:match.start()] != key:
+                continue
+            colon = _JSON_WHITESPACE.match(buf, pos).end()
+            bracket = _JSON_WHITESPACE.match(buf, colon + 1).end()
+            if bracket < len(buf):
+                if buf[colon] == ':' and buf[bracket] == '[':
+                    array_start = bracket
+                continue
+            # Scan the key again once more has been received.
+            pos = string_start - 1
+        elif match:
+            c = match.group()
+            if c == '"':
+                in_string = True
+                string_start = match.end()
+            elif c in '{[':
+                closers.append('}' if c == '{' else ']')
+            elif c in '}]' and closers:
+                closers.pop()
+            pos = match.end()
+            continue
+        else:
+            pos = len(buf)
+        text = read()
+        if text is None:
+            if envelope is not None:
+                envelope.update(json.loads(buf))
+            return
+        buf += text
+
+    prefix = buf[:array_start]
+    if envelope is not None:
+        envelope.update(json.loads(prefix + '[]' + ''.join(reversed(closers))))
+
+    pos = array_start + 1
+    while True:
+        pos = _JSON_SEPARATOR.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == ']':
+            break
+        if pos < len(buf):
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # The buffer may end in the middle of the element.
+                end = None
+            # The decoder accepts any valid prefix of a number, e.g. -2500
+            # of -2500.0, so an element is only complete once it is followed
+            # by the next separator.
+            if end is not None:
+                after = _JSON_WHITESPACE.match(buf, end).end()
+                if after < len(buf) and buf[after] in ',]':
+                    yield element
+                    pos = end
+                    continue
+        text = read()
+        if text is None:
+            raise ValueError('Unexpected end of JSON data')
+        buf = buf[pos:] + text
+        pos = 0
+
+    if envelope is not None:
+        rest = [buf[pos:]]
+        text = read()
+        while text is not None:
+            rest.append(text)
+            text = read()
+        envelope.update(json.loads(prefix + '[' + ''.join(rest)))
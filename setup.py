@@ -2,6 +2,20 @@ from setuptools import setup
 import sys
 
 
+install_requires = [
+    'requests==2.2.0',
+    'jsonpatch==0.4',
+    'pytest==2.3.4',
+    'docopt==0.6.1',
+    'PyYAML==3.10',
+    'clint==0.3.3',
+    'six==1.4.1',
+]
+# concurrent.futures is only part of the standard library since Python 3.2.
+if sys.version_info < (3, 2):
+    install_requires.append('futures==2.1.6')
+
+
 setup(
     name='internetarchive',
     version='0.5.4',
@@ -17,15 +31,7 @@ setup(
     license='LICENSE',
     description='A python interface to archive.org.',
     long_description=open('README.rst').read(),
-    install_requires=[
-        'requests==2.2.0',
-        'jsonpatch==0.4',
-        'pytest==2.3.4',
-        'docopt==0.6.1',
-        'PyYAML==3.10',
-        'clint==0.3.3',
-        'six==1.4.1',
-    ],
+    install_requires=install_requires,
     extras_require = {
         'speedups': [
             'ujson==1.33',
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""Benchmark the throughput of File.download() against a local HTTP server.
+
+Compares the write path used before (1 KB chunks, flushed after every
+chunk) with the current one (large chunks, no per-chunk flush, optional
+preallocation). This script is named so that py.test does not run it.
+
+usage:
+    benchmark_download.py [--size=<MB>] [--runs=<count>]
+
+options:
+    -s, --size=<MB>      Size of the downloaded file in MB [default: 256].
+    -r, --runs=<count>   Report the best of this many runs [default: 3].
+
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+
+from docopt import docopt
+from six.moves import BaseHTTPServer, SimpleHTTPServer, socketserver
+
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+import internetarchive
+
+
+class QuietHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+# old_download()
+#_________________________________________________________________________________________
+def old_download(f, file_path):
+    """The write path of File.download() before large-chunk streaming."""
+    response = f._item.http_session.get(f.url, stream=True)
+    response.raise_for_status()
+    with open(file_path, 'wb') as fp:
+        for chunk in response.iter_content(chunk_size=1024):
+            if chunk:
+                fp.write(chunk)
+                fp.flush()
+
+
+# timed()
+#_________________________________________________________________________________________
+def timed(func, size, runs, out):
+    best = None
+    for i in range(runs):
+        # Truncating a large existing file can take longer than the
+        # download itself, so it is kept out of the timed section.
+        if os.path.exists(out):
+            os.remove(out)
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return size / best / 1048576.0
+
+
+# main()
+#_________________________________________________________________________________________
+def main():
+    args = docopt(__doc__)
+    size_mb = int(args['--size'])
+    runs = int(args['--runs'])
+
+    serve_dir = tempfile.mkdtemp()
+    out_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        size = size_mb * 1048576
+        with open(os.path.join(serve_dir, 'bench.bin'), 'wb') as fp:
+            for i in range(size_mb):
+                fp.write(os.urandom(1048576))
+
+        os.chdir(serve_dir)
+        server = ThreadingServer(('127.0.0.1', 0), QuietHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        item = internetarchive.Item('bench', lazy=True)
+        f = internetarchive.File(item, 'bench.bin', dict(name='bench.bin', size=str(size)))
+        f.url = 'http://127.0.0.1:{0}/bench.bin'.format(server.server_address[1])
+        out = os.path.join(out_dir, 'bench.bin')
+
+        results = [
+            ('1 KB chunks + flush (before)', lambda: old_download(f, out)),
+            ('1 MB chunks', lambda: f.download(out, ignore_existing=True)),
+            ('4 MB chunks', lambda: f.download(out, ignore_existing=True,
+                                               chunk_size=4194304)),
+            ('1 MB chunks + preallocate', lambda: f.download(out, ignore_existing=True,
+                                                             preallocate=True)),
+        ]
+        sys.stdout.write('downloading {0} MB, best of {1} runs\n'.format(size_mb,
+                                                                         runs))
+        for label, func in results:
+            rate = timed(func, size, runs, out)
+            sys.stdout.write(' {0:<30} {1:8.1f} MB/s\n'.format(label, rate))
+        server.shutdown()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(serve_dir)
+        shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    main()
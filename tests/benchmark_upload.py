@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""Benchmark verified uploads with Item.upload_file() against a local server.
+
+Compares computing the MD5 checksum in a separate pass over the file
+before sending it as Content-MD5 (the default) with hashing the file
+while it is being sent (hash_while_sending=True). This script is named so
+that py.test does not run it.
+
+usage:
+    benchmark_upload.py [--size=<MB>] [--runs=<count>]
+
+options:
+    -s, --size=<MB>      Size of the uploaded file in MB [default: 256].
+    -r, --runs=<count>   Report the best of this many runs [default: 3].
+
+"""
+import os
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from docopt import docopt
+from six.moves import BaseHTTPServer, socketserver
+import requests.sessions
+
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+import internetarchive
+from internetarchive.session import ArchiveSession
+
+
+class PutHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Accepts PUT requests and answers with the MD5 of the body as the
+    ETag, like IA-S3.
+
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        md5 = hashlib.md5()
+        remaining = int(self.headers['Content-Length'])
+        while remaining:
+            data = self.rfile.read(min(remaining, 1048576))
+            md5.update(data)
+            remaining -= len(data)
+        self.send_response(200)
+        self.send_header('ETag', '"{0}"'.format(md5.hexdigest()))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class ThreadingServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class LocalSession(requests.sessions.Session):
+    """Sends IA-S3 requests to the local server instead."""
+    def __init__(self, port):
+        super(LocalSession, self).__init__()
+        self.port = port
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace('http://s3.us.archive.org',
+                                          'http://127.0.0.1:{0}'.format(self.port))
+        return super(LocalSession, self).send(request, **kwargs)
+
+
+# timed()
+#_________________________________________________________________________________________
+def timed(func, size, runs):
+    best = None
+    for i in range(runs):
+        start = time.time()
+        response = func()
+        elapsed = time.time() - start
+        response.raise_for_status()
+        best = elapsed if best is None else min(best, elapsed)
+    return size / best / 1048576.0
+
+
+# main()
+#_________________________________________________________________________________________
+def main():
+    args = docopt(__doc__)
+    size_mb = int(args['--size'])
+    runs = int(args['--runs'])
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        size = size_mb * 1048576
+        path = os.path.join(tmp_dir, 'bench.bin')
+        with open(path, 'wb') as fp:
+            for i in range(size_mb):
+                fp.write(os.urandom(1048576))
+
+        server = ThreadingServer(('127.0.0.1', 0), PutHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        archive_session = ArchiveSession({'s3': {'access_key': 'a', 'secret_key': 's'}})
+        archive_session.http_session = LocalSession(server.server_address[1])
+        item = internetarchive.Item('bench', archive_session=archive_session, lazy=True)
+
+        results = [
+            ('separate MD5 pass (default)', lambda: item.upload_file(path, key='bench.bin')),
+            ('MD5 while sending', lambda: item.upload_file(path, key='bench.bin',
+                                                           hash_while_sending=True)),
+        ]
+        sys.stdout.write('uploading {0} MB with verify=True, best of {1} '
+                         'runs\n'.format(size_mb, runs))
+        for label, func in results:
+            rate = timed(func, size, runs)
+            sys.stdout.write(' {0:<30} {1:8.1f} MB/s\n'.format(label, rate))
+        server.shutdown()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
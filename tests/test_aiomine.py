@@ -0,0 +1,56 @@
+import os, sys
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+import pytest
+from requests.exceptions import ConnectionError
+
+try:
+    import asyncio
+    from internetarchive import aiomine
+    from internetarchive.retry import RetryPolicy
+    test = True
+except (ImportError, SyntaxError):
+    test = False
+
+
+def collect(miner):
+    # Iterate without `async for`, so this module still imports on Python 2.
+    loop = asyncio.new_event_loop()
+    results = []
+    agen = miner.__aiter__()
+    try:
+        while True:
+            try:
+                results.append(loop.run_until_complete(agen.__anext__()))
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.close()
+    return results
+
+
+@pytest.mark.skipif('test == False', reason='requires Python 3.6+.')
+def test_async_mine(monkeypatch):
+    attempts = {}
+
+    def get_metadata(self, identifier):
+        attempts[identifier] = attempts.get(identifier, 0) + 1
+        if identifier == 'flaky' and attempts[identifier] == 1:
+            raise ConnectionError('connection reset')
+        if identifier == 'bad':
+            raise ConnectionError('connection refused')
+        return {'metadata': {'identifier': identifier}}
+
+    monkeypatch.setattr(aiomine.AsyncMine, '_get_metadata', get_metadata)
+    ids = ['id{0}'.format(i) for i in range(50)] + ['flaky', 'bad']
+    policy = RetryPolicy(max_requests=3, backoff=0)
+    miner = aiomine.AsyncMine(iter(ids), workers=5, retry_policy=policy)
+    results = collect(miner)
+
+    assert sorted(i for i, md in results) == list(range(51))
+    for i, md in results:
+        assert md['metadata']['identifier'] == ids[i]
+    assert attempts['flaky'] == 2
+    assert attempts['bad'] == 3
+    assert miner.skips == ['bad']
@@ -0,0 +1,135 @@
+import os, sys, json, shutil, time, tempfile, threading
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+from requests import Response
+
+from internetarchive.cache import DiskCache, get_cache
+from internetarchive.item import Item
+from internetarchive.session import ArchiveSession
+
+
+def test_cache():
+    cache_dir = tempfile.mkdtemp()
+    cache = DiskCache(cache_dir, ttl=60, max_entries=10)
+
+    assert cache.get('nasa') is None
+    cache.set('nasa', {'metadata': {'identifier': 'nasa'}}, etag='"abc"')
+    entry = cache.get('nasa')
+    assert entry['value'] == {'metadata': {'identifier': 'nasa'}}
+    assert entry['etag'] == '"abc"'
+    assert cache.is_fresh(entry)
+
+    entry['stored'] = time.time() - 120
+    assert not cache.is_fresh(entry)
+    cache.touch('nasa', entry)
+    assert cache.is_fresh(cache.get('nasa'))
+    assert cache.get('nasa')['etag'] == '"abc"'
+
+    # Least recently used entries are evicted first.
+    for i in range(20):
+        cache.set('item{0}'.format(i), {})
+    assert len(os.listdir(cache_dir)) <= 10
+    assert cache.get('item19') is not None
+
+    assert cache.contains('item19')
+    cache.delete('item19')
+    assert cache.get('item19') is None
+    assert not cache.contains('item19')
+    cache.clear()
+    assert os.listdir(cache_dir) == []
+    shutil.rmtree(cache_dir)
+
+
+def test_get_cache():
+    assert get_cache('metadata', {}) is None
+    cache_dir = tempfile.mkdtemp()
+    cache = get_cache('metadata', {'cache': {'metadata': {'path': cache_dir}}})
+    assert cache.ttl == 3600
+    shutil.rmtree(cache_dir)
+
+
+def test_cache_count():
+    cache_dir = tempfile.mkdtemp()
+    cache = DiskCache(cache_dir)
+    threads = [threading.Thread(target=lambda: [cache.count('hits') for i in range(1000)])
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cache.count('misses')
+    assert cache.stats() == dict(hits=8000, misses=1, revalidations=0)
+    shutil.rmtree(cache_dir)
+
+
+class FakeHTTPSession(object):
+    """Answers Metadata API requests, with 304 if the request's
+    validators match the item's ETag."""
+    def __init__(self):
+        self.requests = []
+        self.items = {'nasa': {'metadata': {'identifier': 'nasa'}, 'files': []}}
+
+    def get(self, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        identifier = url.split('/metadata/', 1)[1]
+        metadata = self.items.get(identifier, {})
+        response = Response()
+        response.url = url
+        response.status_code = 200
+        response._content_consumed = True
+        response._content = json.dumps(metadata).encode('utf-8')
+        response.headers['ETag'] = etag = '"{0}"'.format(len(json.dumps(metadata)))
+        response.headers['Last-Modified'] = 'Thu, 01 Jan 2015 00:00:00 GMT'
+        if headers.get('If-None-Match') == etag:
+            response.status_code = 304
+            response._content = b''
+        return response
+
+
+def test_metadata_cache():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        config = {'cache': {'metadata': {'path': cache_dir, 'ttl': 60}}}
+        archive_session = ArchiveSession(config)
+        archive_session.http_session = http_session = FakeHTTPSession()
+        cache = archive_session.metadata_cache
+
+        item = Item('nasa', archive_session=archive_session)
+        assert item.metadata == {'identifier': 'nasa'}
+        assert http_session.requests[-1][1] == {}
+        assert cache.stats() == dict(hits=0, misses=1, revalidations=0)
+
+        # Fresh entries are used without a request.
+        item = Item('nasa', archive_session=archive_session)
+        assert item.metadata == {'identifier': 'nasa'}
+        assert len(http_session.requests) == 1
+        assert cache.hits == 1
+
+        # Stale entries are revalidated with a conditional request.
+        cache.ttl = 0
+        item = Item('nasa', archive_session=archive_session)
+        assert item.metadata == {'identifier': 'nasa'}
+        assert http_session.requests[-1][1] == {
+            'If-None-Match': '"{0}"'.format(len(json.dumps(http_session.items['nasa']))),
+            'If-Modified-Since': 'Thu, 01 Jan 2015 00:00:00 GMT',
+        }
+        assert cache.revalidations == 1
+        cache.ttl = 60
+        assert cache.is_fresh(cache.get('nasa'))
+
+        # Changed items are fetched again.
+        cache.ttl = 0
+        http_session.items['nasa']['metadata']['title'] = 'NASA'
+        item = Item('nasa', archive_session=archive_session)
+        assert item.metadata == {'identifier': 'nasa', 'title': 'NASA'}
+        assert cache.get('nasa')['value']['metadata']['title'] == 'NASA'
+        assert cache.misses == 2
+
+        # Missing items aren't cached, they may be created at any time.
+        item = Item('missing', archive_session=archive_session)
+        assert not item.exists
+        assert cache.get('missing') is None
+    finally:
+        shutil.rmtree(cache_dir)
@@ -0,0 +1,35 @@
+import os, sys, shutil, tempfile
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+from internetarchive.checkpoint import Checkpoint
+
+
+def test_checkpoint():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'test.checkpoint')
+        flushed = []
+        checkpoint = Checkpoint(path, interval=3600, flush=lambda: flushed.append(True))
+        for i in [0, 7, 8, 1000]:
+            checkpoint.add(i)
+        checkpoint.add(9, skipped=True)
+        checkpoint.add(7)
+        assert len(checkpoint) == 5
+        assert 8 in checkpoint and 9 in checkpoint and 1000 in checkpoint
+        assert 1 not in checkpoint and 1001 not in checkpoint and 10 ** 9 not in checkpoint
+        assert not flushed
+
+        checkpoint.info['output_size'] = 42
+        checkpoint.save()
+        assert flushed
+        # One bit per entry, plus a small header.
+        assert os.path.getsize(path) < 200
+
+        resumed = Checkpoint(path)
+        assert len(resumed) == 5
+        assert [i for i in range(2000) if i in resumed] == [0, 7, 8, 9, 1000]
+        assert resumed.skipped == set([9])
+        assert resumed.info == {'output_size': 42}
+    finally:
+        shutil.rmtree(tmp_dir)
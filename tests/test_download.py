@@ -0,0 +1,306 @@
+import os, sys, json, time, shutil, hashlib, tempfile, threading
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+from requests import Response
+from requests.exceptions import HTTPError
+
+import internetarchive.api
+from internetarchive.item import Item, File
+from internetarchive.session import ArchiveSession
+
+
+FILES = {
+    'a.txt': b'a' * 100,
+    'b.txt': b'0123456789' * 10,
+    'dir/c.txt': b'c' * 30,
+}
+MTIME = 1400000000
+
+
+class FakeResponse(Response):
+    """A response whose body is served in ``chunk_size`` chunks, each
+    delayed by the session's ``latency``."""
+    def __init__(self, session, status_code, content=b''):
+        super(FakeResponse, self).__init__()
+        self.session = session
+        self.status_code = status_code
+        self._content = content
+        self._content_consumed = True
+        self.closed = False
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for i in range(0, len(self._content), chunk_size):
+            if self.closed:
+                break
+            time.sleep(self.session.latency)
+            with self.session.lock:
+                self.session.chunks_sent += 1
+            yield self._content[i:i + chunk_size]
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            with self.session.lock:
+                self.session.active -= 1
+
+
+class FakeHTTPSession(object):
+    """Answers Metadata API and download requests for FILES, with or
+    without support for ``Range`` requests."""
+    def __init__(self, ranges=True, fail=(), latency=0):
+        self.ranges = ranges
+        self.fail = fail
+        self.latency = latency
+        self.requests = []
+        self.chunks_sent = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, stream=False, **kwargs):
+        headers = headers or {}
+        with self.lock:
+            self.requests.append((url, headers.get('Range')))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        if '/metadata/' in url:
+            files = [dict(name=name, size=str(len(data)), mtime=str(MTIME),
+                          md5=hashlib.md5(data).hexdigest())
+                     for (name, data) in sorted(FILES.items())]
+            files.append(dict(name='missing.txt', size='10'))
+            body = json.dumps(dict(metadata=dict(identifier='test'), files=files))
+            return FakeResponse(self, 200, body.encode('utf-8'))
+        name = url.split('/download/test/', 1)[1]
+        data = FILES.get(name)
+        if data is None:
+            return FakeResponse(self, 404)
+        range_header = headers.get('Range')
+        if range_header and self.ranges:
+            start, end = range_header[len('bytes='):].split('-')
+            start = int(start)
+            end = int(end) if end else len(data) - 1
+            if start >= len(data):
+                return FakeResponse(self, 416)
+            if (start, end) in self.fail:
+                return FakeResponse(self, 500)
+            return FakeResponse(self, 206, data[start:end + 1])
+        return FakeResponse(self, 200, data)
+
+
+def get_item(**kwargs):
+    archive_session = ArchiveSession(pool_maxsize=kwargs.pop('pool_maxsize', None))
+    archive_session.http_session = FakeHTTPSession(**kwargs)
+    return Item('test', archive_session=archive_session)
+
+
+class TempDir(object):
+    """Run a test in a temporary working directory."""
+    def __enter__(self):
+        self.cwd = os.getcwd()
+        self.path = tempfile.mkdtemp()
+        os.chdir(self.path)
+        return self.path
+
+    def __exit__(self, *exc_info):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.path)
+
+
+def read(path):
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+def test_download_concurrently():
+    item = get_item()
+    with TempDir():
+        results = item.download(workers=2)
+        assert not results
+        assert sorted(f.name for f in results.downloaded) == sorted(FILES)
+        assert list(results.errors) == ['missing.txt']
+        assert isinstance(results.errors['missing.txt'], HTTPError)
+        assert results.bytes_downloaded == sum(len(d) for d in FILES.values())
+        assert results.summary() == ('downloaded 3 files (230 bytes), skipped 0 '
+                                     'unchanged files (0 bytes), 1 errors')
+        for name, data in FILES.items():
+            assert read(os.path.join('test', name)) == data
+            assert int(os.path.getmtime(os.path.join('test', name))) == MTIME
+
+
+def test_download_sequentially():
+    item = get_item()
+    with TempDir():
+        # Errors are raised when downloading sequentially.
+        try:
+            item.download(glob_pattern='missing.txt')
+        except HTTPError:
+            pass
+        else:
+            assert False, 'expected HTTPError'
+    with TempDir():
+        results = item.download(glob_pattern='[ab].txt')
+        assert results
+        assert [f.name for f in results.downloaded] == ['a.txt', 'b.txt']
+        assert results.bytes_downloaded == 200
+
+
+def test_api_download(monkeypatch):
+    item = get_item()
+    monkeypatch.setattr(internetarchive.api, 'get_item', lambda identifier: item)
+    with TempDir():
+        # Errors of concurrent downloads are returned, not lost.
+        results = internetarchive.api.download('test', workers=2)
+        assert not results
+        assert list(results.errors) == ['missing.txt']
+        assert len(results.downloaded) == 3
+
+        results = internetarchive.api.download('test', 'a.txt', file_path='a.txt')
+        assert results
+        assert [f.name for f in results.downloaded] == ['a.txt']
+        assert results.bytes_downloaded == 100
+
+
+def test_download_resume():
+    item = get_item()
+    data = FILES['b.txt']
+    with TempDir():
+        # 206: only the missing bytes are requested and appended.
+        with open('b.txt', 'wb') as fp:
+            fp.write(data[:25])
+        item.get_file('b.txt').download('b.txt', resume=True)
+        assert item.http_session.requests[-1] == (item.get_file('b.txt').url,
+                                                  'bytes=25-')
+        assert read('b.txt') == data
+
+        # A complete, verified file isn't requested again.
+        count = len(item.http_session.requests)
+        item.get_file('b.txt').download('b.txt', resume=True)
+        assert len(item.http_session.requests) == count
+
+        # A corrupt file of the right size is downloaded again.
+        with open('b.txt', 'wb') as fp:
+            fp.write(b'x' * len(data))
+        item.get_file('b.txt').download('b.txt', resume=True)
+        assert item.http_session.requests[-1][1] is None
+        assert read('b.txt') == data
+
+
+def test_download_resume_range_ignored():
+    # 200: the server ignored the Range header, the partial file is
+    # replaced by the whole response.
+    item = get_item(ranges=False)
+    with TempDir():
+        with open('b.txt', 'wb') as fp:
+            fp.write(b'xxxxx')
+        item.get_file('b.txt').download('b.txt', resume=True)
+        assert item.http_session.requests[-1][1] == 'bytes=5-'
+        assert read('b.txt') == FILES['b.txt']
+
+
+def test_download_resume_complete():
+    # 416: without a size in the metadata, a complete file is only
+    # detected by the server.
+    item = get_item()
+    f = File(item, 'b.txt', {'name': 'b.txt'})
+    with TempDir():
+        with open('b.txt', 'wb') as fp:
+            fp.write(FILES['b.txt'])
+        f.download('b.txt', resume=True)
+        assert item.http_session.requests[-1][1] == 'bytes=100-'
+        assert read('b.txt') == FILES['b.txt']
+
+
+def test_download_sync():
+    item = get_item()
+    with TempDir():
+        results = item.download(glob_pattern='[ab].txt', sync=True)
+        assert results.bytes_downloaded == 200
+
+        f = item.get_file('a.txt')
+        path = os.path.join('test', 'a.txt')
+        assert f.is_synced(path)
+        assert f.is_synced(path, checksum=True)
+        assert not f.is_synced(os.path.join('test', 'nothing.txt'))
+
+        # Files with the same size and mtime but different contents are only
+        # detected with checksum.
+        with open(path, 'wb') as fp:
+            fp.write(b'x' * 100)
+        os.utime(path, (MTIME, MTIME))
+        assert f.is_synced(path)
+        assert not f.is_synced(path, checksum=True)
+
+        os.utime(path, (MTIME + 1, MTIME + 1))
+        assert not f.is_synced(path)
+        with open(path, 'wb') as fp:
+            fp.write(b'a' * 99)
+        os.utime(path, (MTIME, MTIME))
+        assert not f.is_synced(path)
+
+        # Only the files that changed are downloaded again.
+        results = item.download(glob_pattern='[ab].txt', sync=True)
+        assert [f.name for f in results.downloaded] == ['a.txt']
+        assert [f.name for f in results.skipped] == ['b.txt']
+        assert results.bytes_downloaded == 100
+        assert results.bytes_skipped == 100
+        assert read(path) == FILES['a.txt']
+
+
+def test_download_resume_bytes():
+    item = get_item()
+    with TempDir():
+        os.mkdir('test')
+        with open(os.path.join('test', 'b.txt'), 'wb') as fp:
+            fp.write(FILES['b.txt'][:40])
+        results = item.download(glob_pattern='b.txt', resume=True)
+        # Only the bytes transferred are counted.
+        assert results.bytes_downloaded == 60
+        results = item.download(glob_pattern='b.txt', resume=True, workers=2)
+        assert results.bytes_downloaded == 0
+
+
+def get_segmented_item(**kwargs):
+    item = get_item(**kwargs)
+    # The metadata response isn't closed, only count downloads.
+    item.http_session.active = item.http_session.max_active = 0
+    return item
+
+
+def test_download_segments():
+    item = get_segmented_item(pool_maxsize=2, latency=0.001)
+    with TempDir():
+        assert item.get_file('b.txt').download('b.txt', segments=4, chunk_size=5) == 100
+        assert read('b.txt') == FILES['b.txt']
+        ranges = sorted(r for (url, r) in item.http_session.requests[1:])
+        assert ranges == ['bytes=0-0', 'bytes=0-24', 'bytes=25-49', 'bytes=50-74',
+                          'bytes=75-99']
+        # At most as many segments as pooled connections are downloaded
+        # at a time.
+        assert item.http_session.max_active == 2
+        assert item.http_session.active == 0
+
+
+def test_download_segments_range_ignored():
+    item = get_segmented_item(ranges=False)
+    with TempDir():
+        item.get_file('b.txt').download('b.txt', segments=4)
+        assert read('b.txt') == FILES['b.txt']
+        # The probe is answered with 200, so the file is downloaded as a
+        # single stream.
+        assert [r for (url, r) in item.http_session.requests[1:]] == ['bytes=0-0', None]
+
+
+def test_download_segments_error():
+    item = get_segmented_item(fail=[(25, 49)], latency=0.01)
+    with TempDir():
+        try:
+            item.get_file('a.txt').download('a.txt', segments=4, chunk_size=1)
+        except HTTPError:
+            pass
+        else:
+            assert False, 'expected HTTPError'
+        assert not os.path.exists('a.txt')
+        # The other segments are stopped rather than downloaded to the end.
+        assert item.http_session.chunks_sent < 30
+        assert item.http_session.active == 0
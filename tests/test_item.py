@@ -1,8 +1,48 @@
-import os, sys, shutil
+import os, sys, json, shutil
 inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, inc_path)
 
+from fnmatch import fnmatch
+
+from requests import Response
+
 import internetarchive
+from internetarchive.session import ArchiveSession
+
+
+FILES = [
+    {'name': 'nasa_meta.xml', 'source': 'metadata', 'format': 'Metadata'},
+    {'name': 'globe.jpg', 'source': 'original', 'format': 'JPEG'},
+    {'name': 'globe_thumb.jpg', 'source': 'derivative', 'format': 'JPEG Thumb'},
+    {'name': 'notes.txt', 'source': 'original'},
+    {'name': 'moon.jpg', 'source': 'original', 'format': 'JPEG'},
+    {'name': 'moon.txt', 'source': 'derivative', 'format': 'DjVuTXT'},
+    {'name': 'nasa_files.xml', 'source': 'metadata', 'format': 'Metadata'},
+    {'name': 'photos/moon.png', 'source': 'original', 'format': 'PNG'},
+]
+
+
+class FakeHTTPSession(object):
+    """Answers Metadata API requests for an item with FILES."""
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append(url)
+        response = Response()
+        response.url = url
+        response.status_code = 200
+        response._content_consumed = True
+        metadata = dict(metadata=dict(identifier='nasa'), files=FILES)
+        response._content = json.dumps(metadata).encode('utf-8')
+        return response
+
+
+def get_item(lazy=False):
+    archive_session = ArchiveSession()
+    archive_session.http_session = FakeHTTPSession()
+    return internetarchive.Item('nasa', archive_session=archive_session, lazy=lazy)
+
 
 def test_item():
     item = internetarchive.Item('nasa')
@@ -29,3 +69,102 @@ def test_download():
     assert os.path.exists(item_dir)
     assert os.path.exists(os.path.join(item_dir, item.identifier+'_meta.xml'))
     shutil.rmtree(item_dir)
+
+
+def test_lazy_item():
+    item = internetarchive.Item('nasa', lazy=True)
+    assert '_json' not in item.__dict__
+    assert item.identifier == 'nasa'
+    assert item.metadata['identifier'] == 'nasa'
+    assert item.exists
+
+
+def test_lazy_item_repr():
+    item = get_item(lazy=True)
+    # Showing a lazy item doesn't load its metadata.
+    assert repr(item) == "Item(identifier='nasa', exists=None)"
+    assert item.http_session.requests == []
+    assert item.exists
+    assert repr(item) == "Item(identifier='nasa', exists=True)"
+
+
+def scan_files(item, source=None, formats=None, glob_pattern=None):
+    # The files Item.download() selected by scanning every file, before
+    # the item's files were indexed.
+    files = item.iter_files()
+    if source:
+        if isinstance(source, str):
+            source = [source]
+        files = [f for f in files if f.source in source]
+    if formats:
+        if isinstance(formats, str):
+            formats = [formats]
+        files = [f for f in files if f.format in formats]
+    if glob_pattern:
+        files = [f for f in files if fnmatch(f.name, glob_pattern)]
+    return [f.name for f in files]
+
+
+def scan_get_files(item, files=None, source=None, formats=None, glob_pattern=None):
+    # Item.get_files() before the item's files were indexed, except that an
+    # omitted ``formats`` doesn't select the files without a format.
+    files = [] if not files else files
+    source = [] if not source else source
+    formats = [] if not formats else formats
+    if not isinstance(files, (list, tuple, set)):
+        files = [files]
+    if not isinstance(source, (list, tuple, set)):
+        source = [source]
+    if not isinstance(formats, (list, tuple, set)):
+        formats = [formats]
+    names = []
+    for f in item.iter_files():
+        if f.name in files or f.source in source or f.format in formats:
+            names.append(f.name)
+        elif glob_pattern and fnmatch(f.name, glob_pattern):
+            names.append(f.name)
+    return names
+
+
+def test_select_files():
+    item = get_item()
+    for source in [None, 'original', ['metadata', 'derivative'], 'nothing']:
+        for formats in [None, 'JPEG', ['JPEG', 'PNG'], 'nothing']:
+            for glob_pattern in [None, '*.jpg', 'moon*', 'photos/*']:
+                names = [f.name for f in item._select_files(source, formats, glob_pattern)]
+                assert names == scan_files(item, source, formats, glob_pattern)
+
+    assert [f.name for f in item._select_files('original', 'JPEG', 'moon*')] == ['moon.jpg']
+    assert len(list(item._select_files())) == len(FILES)
+
+
+def test_get_files():
+    item = get_item()
+    for files in [None, 'notes.txt', ['moon.jpg', 'missing.txt']]:
+        for source in [None, 'original', ['metadata', 'derivative']]:
+            for formats in [None, 'JPEG', ['JPEG', 'PNG']]:
+                for glob_pattern in [None, '*.jpg', 'photos/*']:
+                    names = [f.name for f in item.get_files(files, source, formats,
+                                                            glob_pattern)]
+                    assert names == scan_get_files(item, files, source, formats,
+                                                   glob_pattern)
+
+    # Filters are combined with OR.
+    names = [f.name for f in item.get_files('notes.txt', formats='PNG',
+                                            glob_pattern='*.jpg')]
+    assert names == ['globe.jpg', 'globe_thumb.jpg', 'notes.txt', 'moon.jpg',
+                     'photos/moon.png']
+    # Omitting formats doesn't select the files without a format.
+    assert item.get_files() == []
+    assert [f.name for f in item.get_files(source='original')] == [
+        'globe.jpg', 'notes.txt', 'moon.jpg', 'photos/moon.png']
+
+
+def test_get_file():
+    item = get_item()
+    for file_dict in FILES:
+        f = item.get_file(file_dict['name'])
+        assert f.name == file_dict['name']
+        assert f.source == file_dict['source']
+        assert f.format == file_dict.get('format')
+    assert item.get_file('missing.txt') is None
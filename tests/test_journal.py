@@ -0,0 +1,59 @@
+import os, sys, shutil, tempfile
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+import internetarchive
+from internetarchive.journal import UploadJournal
+
+
+def test_upload_journal():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'test.txt')
+        with open(path, 'w') as fp:
+            fp.write('test')
+        journal = UploadJournal(os.path.join(tmp_dir, 'journal.sqlite'))
+        assert journal.get('test-item', 'test.txt', path) is None
+
+        journal.record('test-item', 'test.txt', path, '098f6bcd4621d373cade4e832627b4f6')
+        entry = journal.get('test-item', 'test.txt', path)
+        assert entry['size'] == 4
+        assert entry['md5'] == '098f6bcd4621d373cade4e832627b4f6'
+        assert journal.get('other-item', 'test.txt', path) is None
+
+        # Changed files are uploaded again.
+        with open(path, 'w') as fp:
+            fp.write('changed')
+        assert journal.get('test-item', 'test.txt', path) is None
+
+        journal.record('test-item', 'test.txt', path)
+        journal.forget('test-item', 'test.txt')
+        assert journal.get('test-item', 'test.txt', path) is None
+        journal.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_skip_journaled_uploads():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for name in ['a.txt', 'b.txt']:
+            paths.append(os.path.join(tmp_dir, name))
+            with open(paths[-1], 'w') as fp:
+                fp.write('test')
+        journal = UploadJournal(os.path.join(tmp_dir, 'journal.sqlite'))
+        for path in paths:
+            journal.record('test-item', os.path.basename(path), path)
+
+        item = internetarchive.Item('test-item', lazy=True)
+        uploads = [(paths[0], None), (paths[1], 'b.txt')]
+        assert list(item._skip_journaled_uploads(uploads, journal)) == []
+
+        item._get_remote_files = lambda: {'a.txt': {'name': 'a.txt', 'size': '4'}}
+        skipped = item._skip_journaled_uploads(uploads, journal, check_remote=True)
+        assert list(skipped) == [(paths[1], 'b.txt')]
+        assert journal.get('test-item', 'b.txt', paths[1]) is None
+        journal.close()
+    finally:
+        shutil.rmtree(tmp_dir)
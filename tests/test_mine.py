@@ -49,3 +49,75 @@ def test_bad_ids():
     assert len(bad_results) == 0
     # ... and it should record what it skips (i.e. everything):
     assert set(bad_miner.skips) == set(bad_ids)
+
+
+@pytest.mark.skipif('test == False', reason='requires gevent.')
+def test_ordered(monkeypatch):
+    import random
+    import gevent
+
+    class FakeItem(object):
+        def __init__(self, identifier, archive_session=None):
+            gevent.sleep(random.random() * 0.01)
+            if identifier == 'bad':
+                raise ValueError(identifier)
+            self.identifier = identifier
+
+    monkeypatch.setattr(internetarchive.mine, 'Item', FakeItem)
+    ids = ['id{0}'.format(i) for i in range(100)] + ['bad', 'last']
+    miner = internetarchive.mine.Mine(ids, workers=10, ordered=True, window=20)
+    results = [(i, item.identifier) for i, item in miner]
+    assert results == [(i, ident) for i, ident in enumerate(ids) if ident != 'bad']
+    assert miner.skips == ['bad']
+
+
+@pytest.mark.skipif('test == False', reason='requires gevent.')
+def test_lazy_identifiers(monkeypatch):
+    class FakeItem(object):
+        def __init__(self, identifier, archive_session=None):
+            self.identifier = identifier
+
+    monkeypatch.setattr(internetarchive.mine, 'Item', FakeItem)
+    consumed = []
+
+    def identifiers():
+        for i in range(10000):
+            consumed.append(i)
+            yield 'id{0}'.format(i)
+
+    miner = internetarchive.mine.Mine(identifiers(), workers=5, window=10)
+    for i, item in miner:
+        # The input is read at most a window ahead of the output.
+        assert len(consumed) <= miner.got_count + miner.window + 1
+        if miner.got_count == 100:
+            break
+    assert len(consumed) < 200
+
+
+@pytest.mark.skipif('test == False', reason='requires gevent.')
+def test_checkpoint(monkeypatch, tmpdir):
+    from internetarchive.checkpoint import Checkpoint
+
+    class FakeItem(object):
+        def __init__(self, identifier, archive_session=None):
+            if identifier == 'bad':
+                raise ValueError(identifier)
+            self.identifier = identifier
+
+    monkeypatch.setattr(internetarchive.mine, 'Item', FakeItem)
+    path = str(tmpdir.join('mine.checkpoint'))
+    ids = ['id{0}'.format(i) for i in range(100)] + ['bad']
+
+    miner = internetarchive.mine.Mine(ids, workers=5, ordered=True,
+                                      checkpoint=Checkpoint(path))
+    for i, item in miner:
+        # Stop after handling 50 items; the 51st is not recorded.
+        if i == 50:
+            break
+
+    miner = internetarchive.mine.Mine(ids, workers=5, ordered=True,
+                                      checkpoint=Checkpoint(path))
+    results = [i for i, item in miner]
+    assert miner.resumed_count == 50
+    assert results == list(range(50, 100))
+    assert Checkpoint(path).skipped == set([100])
@@ -0,0 +1,45 @@
+import os, sys
+from io import BytesIO
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+import internetarchive
+from internetarchive.multipart import MultipartUpload, MIN_PART_SIZE, iter_xml_elements
+
+
+def test_iter_parts():
+    item = internetarchive.Item('iacli-test-item', lazy=True)
+    upload = MultipartUpload(item, 'test.bin', part_size=1)
+    assert upload.part_size == MIN_PART_SIZE
+    assert upload.url.endswith('s3.us.archive.org/iacli-test-item/test.bin')
+
+    data = b'a' * (MIN_PART_SIZE * 2 + 10)
+    parts = list(upload.iter_parts(BytesIO(data)))
+    assert [n for n, d in parts] == [1, 2, 3]
+    assert [len(d) for n, d in parts] == [MIN_PART_SIZE, MIN_PART_SIZE, 10]
+
+
+def test_iter_xml_elements():
+    xml = ('<InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+           '<UploadId>abc</UploadId></InitiateMultipartUploadResult>')
+    assert [e.text for e in iter_xml_elements(xml, 'UploadId')] == ['abc']
+
+
+def test_upload_stream_in_parts():
+    item = internetarchive.Item('iacli-test-item', lazy=True)
+    read_fd, write_fd = os.pipe()
+    os.close(write_fd)
+    stream = os.fdopen(read_fd, 'rb')
+    try:
+        upload = item.upload_file(stream, key='stream.bin', debug=True)
+        assert isinstance(upload, MultipartUpload)
+        assert upload.key == 'stream.bin'
+
+        try:
+            item.upload_file(stream, debug=True)
+        except ValueError:
+            pass
+        else:
+            assert False, 'expected ValueError without a key'
+    finally:
+        stream.close()
@@ -0,0 +1,69 @@
+import os, sys, time
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+from requests import Response
+from requests.exceptions import ConnectionError, HTTPError
+
+from internetarchive.retry import (RetryPolicy, TokenBucket, AdaptiveConcurrency,
+                                   get_retry_after)
+
+
+def http_error(status_code, headers={}):
+    response = Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return HTTPError('{0} error'.format(status_code), response=response)
+
+
+def test_retry_policy():
+    policy = RetryPolicy(max_requests=3, backoff=1, max_backoff=3)
+    assert policy.should_retry(ConnectionError('reset'), 1)
+    assert policy.should_retry(http_error(503), 2)
+    assert not policy.should_retry(http_error(503), 3)
+    assert not policy.should_retry(http_error(404), 1)
+    assert not policy.should_retry(ValueError('bad identifier'), 1)
+    assert RetryPolicy(max_requests=None).should_retry(ConnectionError('reset'), 1000)
+
+    for num_requests, maximum in [(1, 1), (2, 2), (3, 3), (10, 3)]:
+        delay = policy.get_delay(ConnectionError('reset'), num_requests)
+        assert maximum / 2.0 <= delay <= maximum
+    assert policy.get_delay(http_error(429, {'Retry-After': '120'}), 1) == 120
+    assert policy.get_delay(http_error(500, {'Retry-After': '120'}), 1) <= 1
+
+
+def test_get_retry_after():
+    assert get_retry_after(None) is None
+    assert get_retry_after(http_error(503).response) is None
+    assert get_retry_after(http_error(503, {'Retry-After': '5'}).response) == 5
+    date = 'Fri, 31 Dec 1999 23:59:59 GMT'
+    assert get_retry_after(http_error(503, {'Retry-After': date}).response) == 0
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=100, burst=5)
+    start = time.time()
+    for i in range(15):
+        bucket.acquire()
+    # 5 requests in the burst, then 10 at 100 requests per second.
+    assert 0.08 <= time.time() - start < 0.5
+
+    bucket = TokenBucket()
+    bucket.pause(0.1)
+    start = time.time()
+    bucket.acquire()
+    assert time.time() - start >= 0.09
+
+
+def test_adaptive_concurrency():
+    concurrency = AdaptiveConcurrency(8)
+    concurrency.record_error()
+    assert concurrency.limit == 4
+    # Errors from requests already in flight don't lower the limit again.
+    concurrency.record_error()
+    assert concurrency.limit == 4
+    for i in range(4):
+        concurrency.record_success()
+    assert concurrency.limit == 5
+    concurrency.record_error()
+    assert concurrency.limit == 2
@@ -0,0 +1,202 @@
+import os, sys, json, time, shutil, tempfile, threading
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+from requests import Response
+
+from internetarchive.search import Search
+from internetarchive.session import ArchiveSession
+
+
+DOCS = [{'identifier': 'item{0:03d}'.format(i)} for i in range(250)]
+
+
+class FakeHTTPSession(object):
+    """Answers advancedsearch and scrape requests from DOCS."""
+    def __init__(self, latency=0):
+        self.requests = []
+        self.latency = latency
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, stream=False, **kwargs):
+        params = dict(params or {})
+        with self.lock:
+            self.requests.append((url, params))
+            self.streamed = stream
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        if url.endswith('/scrape'):
+            start = int(params.get('cursor', 0))
+            end = start + int(params['count'])
+            body = dict(items=DOCS[start:end], count=len(DOCS[start:end]),
+                        total=len(DOCS))
+            if end < len(DOCS):
+                body['cursor'] = str(end)
+        else:
+            rows = int(params['rows'])
+            start = (int(params.get('page', 1)) - 1) * rows
+            body = dict(
+                responseHeader=dict(params=dict(q=params['q'])),
+                response=dict(numFound=len(DOCS), start=start,
+                              docs=DOCS[start:start + rows]),
+            )
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = json.dumps(body).encode('utf-8')
+        response._content_consumed = True
+        return response
+
+
+def get_search(latency=0, config=None, **kwargs):
+    archive_session = ArchiveSession(config)
+    archive_session.http_session = FakeHTTPSession(latency)
+    return Search('collection:test', archive_session=archive_session, **kwargs)
+
+
+def test_search_pages():
+    search = get_search()
+    # Nothing is requested until it is needed.
+    assert search.http_session.requests == []
+    assert repr(search) == "Search(query='collection:test', num_found=None)"
+    assert list(search) == DOCS
+    # The number of results is taken from the first page, which is only
+    # requested once.
+    assert search.num_found == 250
+    pages = [p.get('page') for url, p in search.http_session.requests]
+    assert pages == [1, 2, 3]
+
+    search = get_search(page_size=50)
+    assert search.num_found == 250
+    url, params = search.http_session.requests[0]
+    assert params['rows'] == 0
+    assert list(search) == DOCS
+    pages = [p.get('page') for url, p in search.http_session.requests[1:]]
+    assert pages == [1, 2, 3, 4, 5]
+
+
+def test_search_scrape():
+    search = get_search(scrape=True, page_size=100, params={'sort[1]': 'date desc',
+                                                            'sort[0]': 'identifier asc'})
+    assert list(search) == DOCS
+    scrape_requests = [p for url, p in search.http_session.requests
+                       if url.endswith('/scrape')]
+    assert len(scrape_requests) == 3
+    assert [p.get('cursor') for p in scrape_requests] == [None, '100', '200']
+    assert scrape_requests[0]['sorts'] == 'identifier asc,date desc'
+    assert scrape_requests[0]['fields'] == 'identifier'
+
+
+def test_search_prefetch():
+    search = get_search(latency=0.01, prefetch=3, page_size=10)
+    assert list(search) == DOCS
+    assert search.http_session.max_active > 1
+
+    search = get_search(latency=0.01, prefetch=3, page_size=10, scrape=True)
+    assert list(search) == DOCS
+
+    # Stopping early doesn't fetch every page.
+    search = get_search(latency=0.01, prefetch=2, page_size=10)
+    for i, doc in enumerate(search):
+        if i == 15:
+            break
+    time.sleep(0.05)
+    assert len(search.http_session.requests) < 10
+
+
+def test_search_stream():
+    search = get_search(stream=True, page_size=100)
+    assert list(search) == DOCS
+    assert search.http_session.streamed
+    assert search.num_found == 250
+    pages = [p.get('page') for url, p in search.http_session.requests]
+    assert pages == [1, 2, 3]
+
+    search = get_search(stream=True, scrape=True, page_size=100)
+    assert list(search) == DOCS
+    cursors = [p.get('cursor') for url, p in search.http_session.requests]
+    assert cursors == [None, '100', '200']
+
+    search = get_search(latency=0.01, stream=True, prefetch=3, page_size=10)
+    assert list(search) == DOCS
+    search = get_search(latency=0.01, stream=True, prefetch=3, page_size=10, scrape=True)
+    assert list(search) == DOCS
+
+
+def test_search_cache():
+    cache_dir = tempfile.mkdtemp()
+    config = {'cache': {'search': {'path': cache_dir, 'ttl': 60}}}
+    for kwargs in [dict(page_size=100), dict(page_size=100, scrape=True),
+                   dict(page_size=100, stream=True, prefetch=2)]:
+        search = get_search(config=config, **kwargs)
+        assert list(search) == DOCS
+        assert search.session.search_cache.misses == 3
+
+        # The same query is answered from the cache, also when default
+        # parameters are given explicitly.
+        search = get_search(config=config, params={'output': 'json'}, **kwargs)
+        assert search.num_found == 250
+        assert list(search) == DOCS
+        assert search.http_session.requests == []
+        assert search.session.search_cache.hits == 3
+        shutil.rmtree(cache_dir)
+
+    # Other queries are cached separately.
+    get_search(config=config, page_size=100).num_found
+    search = get_search(config=config, page_size=50)
+    assert list(search) == DOCS
+    assert len(search.http_session.requests) == 5
+
+    # Partial results aren't used.
+    search = get_search(config=config, page_size=50, params={'fl[]': 'title'})
+    for i, doc in enumerate(search):
+        if i == 60:
+            break
+    search = get_search(config=config, page_size=50, params={'fl[]': 'title'})
+    assert list(search) == DOCS
+    pages = [p.get('page') for url, p in search.http_session.requests]
+    assert pages == [1, 2, 3, 4, 5]
+
+    # Stale results are fetched again as a whole.
+    search = get_search(config=config, page_size=50)
+    search.session.search_cache.ttl = 0
+    assert list(search) == DOCS
+    pages = [p.get('page') for url, p in search.http_session.requests]
+    assert pages == [1, 2, 3, 4, 5]
+    assert search.session.search_cache.hits == 0
+
+    # So are results missing a page, rather than mixing pages of different
+    # fetches.
+    search = get_search(config=config, page_size=50)
+    assert list(search) == DOCS
+    assert search.http_session.requests == []
+    search.session.search_cache.delete(search._get_page_key(3))
+    search = get_search(config=config, page_size=50)
+    assert list(search) == DOCS
+    pages = [p.get('page') for url, p in search.http_session.requests]
+    assert pages == [1, 2, 3, 4, 5]
+    assert search.session.search_cache.hits == 0
+    search = get_search(config=config, page_size=50)
+    assert list(search) == DOCS
+    assert search.http_session.requests == []
+
+    # A page evicted while the results are read can't be fetched again.
+    search = get_search(config=config, page_size=50)
+    docs = iter(search)
+    next(docs)
+    search.session.search_cache.delete(search._get_page_key(3))
+    try:
+        list(docs)
+    except IOError:
+        pass
+    else:
+        assert False, 'expected IOError'
+    search = get_search(config=config, page_size=50)
+    assert list(search) == DOCS
+    assert len(search.http_session.requests) == 5
+    shutil.rmtree(cache_dir)
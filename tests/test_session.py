@@ -2,9 +2,19 @@ import os, sys, shutil
 inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, inc_path)
 
-from internetarchive.session import get_session
+from internetarchive.session import get_session, get_default_session
 
 def test_session():
     s = get_session()
     s.set_file_logger(0, 'test.log')
     os.remove('test.log')
+
+
+def test_shared_session():
+    s = get_default_session()
+    assert get_default_session() is s
+    assert s.http_session.cookies is s.cookies
+
+    s = get_session(pool_maxsize=50)
+    assert s.http_config['pool_maxsize'] == 50
+    assert s.http_session.get_adapter('http://archive.org')._pool_maxsize == 50
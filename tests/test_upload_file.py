@@ -0,0 +1,312 @@
+import io, os, sys, shutil, hashlib, tempfile, threading
+inc_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, inc_path)
+
+from requests import Response
+from requests.exceptions import ConnectionError
+
+import internetarchive.item
+import internetarchive.multipart
+
+from internetarchive.item import Item
+from internetarchive.journal import UploadJournal
+from internetarchive.session import ArchiveSession
+
+
+class FakeS3Session(object):
+    """Answers IA-S3 uploads, both single PUTs and multipart uploads.
+
+    ``statuses`` maps a key to the statuses of its successive responses,
+    or exceptions to raise instead, after which uploads succeed.
+    ``complete_error`` is the number of CompleteMultipartUpload requests,
+    or all of them if ``True``, answered with an error in the body of a
+    200 response, as S3 can.
+    ``etag`` is the ETag of single PUTs: the body's MD5 if ``True``, none
+    if ``False``.
+
+    """
+    def __init__(self, statuses=None, complete_error=False, etag=True):
+        self.statuses = dict(statuses or {})
+        self.complete_error = complete_error
+        self.etag = etag
+        self.requests = []
+        self.uploaded = {}
+        self.parts = {}
+        self.in_progress = {}
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        url, query = (request.url.split('?', 1) + [''])[:2]
+        key = (url.split('/', 4) + [''])[4]
+        body = request.body
+        if hasattr(body, 'read'):
+            body = body.read()
+        body = body or b''
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        with self.lock:
+            self.requests.append((request.method, key, query, dict(request.headers)))
+            statuses = self.statuses.get(key)
+            status = statuses.pop(0) if statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        response = Response()
+        response.url = request.url
+        response.status_code = status
+        response._content = b''
+        if status != 200:
+            response._content = (b'<Error><Code>SlowDown</Code>'
+                                 b'<Message>Please reduce your request rate.</Message>'
+                                 b'</Error>')
+            return response
+        md5 = hashlib.md5(body).hexdigest()
+        if request.headers.get('Content-MD5') and request.headers['Content-MD5'] != md5:
+            response.status_code = 400
+            response._content = (b'<Error><Code>BadDigest</Code><Message>The Content-MD5 '
+                                 b'you specified did not match.</Message></Error>')
+            return response
+        if query == 'uploads':
+            upload_id = 'upload{0}'.format(len(self.in_progress) + 1)
+            self.in_progress[upload_id] = key
+            response._content = '<Result><UploadId>{0}</UploadId></Result>'.format(
+                upload_id).encode('utf-8')
+        elif query.startswith('uploads&prefix'):
+            response._content = ''.join(
+                ['<ListMultipartUploadsResult>']
+                + ['<Upload><Key>{0}</Key><UploadId>{1}</UploadId></Upload>'.format(k, u)
+                   for (u, k) in sorted(self.in_progress.items())]
+                + ['</ListMultipartUploadsResult>']).encode('utf-8')
+        elif query.startswith('partNumber'):
+            part_number = int(query.split('&')[0].split('=')[1])
+            self.parts[part_number] = body
+            response.headers['ETag'] = '"{0}"'.format(md5)
+        elif query.startswith('uploadId') and request.method == 'GET':
+            response._content = ''.join(
+                ['<ListPartsResult>']
+                + ['<Part><PartNumber>{0}</PartNumber><ETag>"{1}"</ETag></Part>'.format(
+                    n, hashlib.md5(self.parts[n]).hexdigest()) for n in sorted(self.parts)]
+                + ['</ListPartsResult>']).encode('utf-8')
+        elif query.startswith('uploadId'):
+            if self.complete_error:
+                if self.complete_error is not True:
+                    self.complete_error -= 1
+                response._content = (b'<Error><Code>InternalError</Code><Message>We '
+                                     b'encountered an internal error.</Message></Error>')
+            else:
+                self.uploaded[key] = b''.join(self.parts[n] for n in sorted(self.parts))
+                del self.in_progress[query.split('=', 1)[1]]
+                response._content = b'<CompleteMultipartUploadResult/>'
+        else:
+            self.uploaded[key] = body
+            if self.etag:
+                etag = md5 if self.etag is True else self.etag
+                response.headers['ETag'] = '"{0}"'.format(etag)
+        return response
+
+
+def get_item(**kwargs):
+    archive_session = ArchiveSession({'s3': {'access_key': 'a', 'secret_key': 's'}})
+    archive_session.http_session = FakeS3Session(**kwargs)
+    return Item('test', archive_session=archive_session, lazy=True)
+
+
+class TempFiles(object):
+    """Create files with the given contents in a temporary directory."""
+    def __init__(self, **files):
+        self.files = files
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp()
+        paths = []
+        for name, data in sorted(self.files.items()):
+            paths.append(os.path.join(self.path, name))
+            with open(paths[-1], 'wb') as fp:
+                fp.write(data)
+        return paths
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.path)
+
+
+def test_multipart_complete_error():
+    # A failure reported in the body of a 200 response is not a success.
+    item = get_item(complete_error=True)
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        journal = UploadJournal(os.path.join(os.path.dirname(paths[0]), 'journal'))
+        responses = item.upload(paths, multipart=True, journal=journal)
+        assert responses[0].status_code == 500
+        assert b'InternalError' in responses[0].content
+        assert journal.get('test', 'a.bin', paths[0]) is None
+        journal.close()
+
+
+def test_upload_content_md5():
+    item = get_item()
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        r = item.upload_file(paths[0], delete=True)
+        assert r.status_code == 200
+        method, key, query, headers = item.http_session.requests[-1]
+        assert headers['Content-MD5'] == hashlib.md5(b'a' * 100).hexdigest()
+        assert not os.path.exists(paths[0])
+
+    # A corrupt upload is rejected by IA-S3, the local file is kept.
+    item = get_item()
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        r = item.upload_file(paths[0], delete=True, checksum_manifest={'a.bin': 'x' * 32})
+        assert r.status_code == 400
+        assert 'a.bin' not in item.http_session.uploaded
+        assert os.path.exists(paths[0])
+
+
+def test_upload_hash_while_sending():
+    item = get_item()
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        r = item.upload_file(paths[0], delete=True, hash_while_sending=True)
+        assert r.status_code == 200
+        method, key, query, headers = item.http_session.requests[-1]
+        assert 'Content-MD5' not in headers
+        assert not os.path.exists(paths[0])
+
+    item = get_item(etag='x' * 32)
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        try:
+            item.upload_file(paths[0], delete=True, hash_while_sending=True)
+        except IOError as e:
+            assert 'checksum mismatch' in str(e)
+        else:
+            assert False, 'expected IOError'
+        assert os.path.exists(paths[0])
+
+    # Without an ETag, the upload can't be verified.
+    item = get_item(etag=False)
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        r = item.upload_file(paths[0], delete=True, hash_while_sending=True)
+        assert r.status_code == 200
+        assert os.path.exists(paths[0])
+
+
+def puts(item, key):
+    return [r for r in item.http_session.requests if r[0] == 'PUT' and r[1] == key]
+
+
+def test_upload_retries(monkeypatch):
+    monkeypatch.setattr(internetarchive.item.time, 'sleep', lambda seconds: None)
+    item = get_item(statuses={'a.bin': [503, 429, ConnectionError('reset')],
+                              'b.bin': [403, 503]})
+    with TempFiles(**{'a.bin': b'a' * 100, 'b.bin': b'b' * 100}) as paths:
+        # 5xx, 429 and connection errors are retried, with the file sent
+        # from the start.
+        results = item.upload(paths[0], retries=3)
+        assert [r.status_code for r in results] == [200]
+        assert len(puts(item, 'a.bin')) == 4
+        assert item.http_session.uploaded['a.bin'] == b'a' * 100
+
+        # 4xx responses are not.
+        results = item.upload(paths[1], retries=3)
+        assert [r.status_code for r in results] == [403]
+        assert results.failed == ['b.bin']
+        assert len(puts(item, 'b.bin')) == 1
+
+    item = get_item(statuses={'a.bin': [503, 503]})
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        results = item.upload(paths[0], retries=1)
+        assert [r.status_code for r in results] == [503]
+        assert len(puts(item, 'a.bin')) == 2
+
+
+def test_upload_concurrently(monkeypatch):
+    monkeypatch.setattr(internetarchive.item.time, 'sleep', lambda seconds: None)
+    item = get_item(statuses={'b.bin': [403],
+                              'c.bin': [ConnectionError('reset')] * 2})
+    files = dict(('{0}.bin'.format(c), c.encode('ascii') * 100) for c in 'abcde')
+    with TempFiles(**files) as paths:
+        missing = os.path.join(os.path.dirname(paths[0]), 'missing.bin')
+        results = item.upload(paths[:3] + [missing] + paths[3:], workers=2, retries=1)
+        # Every file is reported, in order, whether or not others failed.
+        assert results.keys == ['a.bin', 'b.bin', 'd.bin', 'e.bin']
+        assert [r.status_code for r in results] == [200, 403, 200, 200]
+        assert list(results.errors) == ['c.bin', 'missing.bin']
+        assert isinstance(results.errors['c.bin'], ConnectionError)
+        assert isinstance(results.errors['missing.bin'], IOError)
+        assert results.failed == ['b.bin', 'c.bin', 'missing.bin']
+        for name in ['a.bin', 'd.bin', 'e.bin']:
+            assert item.http_session.uploaded[name] == files[name]
+        try:
+            results.raise_for_errors()
+        except ConnectionError:
+            pass
+        else:
+            assert False, 'expected ConnectionError'
+
+
+def test_upload_stream_retries(monkeypatch):
+    monkeypatch.setattr(internetarchive.item.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(internetarchive.multipart.time, 'sleep', lambda seconds: None)
+
+    def pipe(data):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, data)
+        os.close(write_fd)
+        return os.fdopen(read_fd, 'rb')
+
+    # A failed part is retried on its own.
+    item = get_item(statuses={'stream.bin': [200, 503]})
+    with pipe(b's' * 100) as stream:
+        results = item.upload(stream, key='stream.bin', retries=2)
+    assert [r.status_code for r in results] == [200]
+    assert item.http_session.uploaded['stream.bin'] == b's' * 100
+
+    # A stream can't be sent again, so the upload isn't retried as a whole,
+    # which would also start a new multipart upload.
+    item = get_item(statuses={'stream.bin': [200] + [503] * 4})
+    with pipe(b's' * 100) as stream:
+        results = item.upload(stream, key='stream.bin', retries=2)
+    assert [r.status_code for r in results] == [503]
+    initiated = [r for r in item.http_session.requests if r[2] == 'uploads']
+    assert len(initiated) == 1
+
+
+def test_upload_journal():
+    item = get_item()
+    with TempFiles(**{'a.bin': b'a' * 100, 'b.bin': b'b' * 100}) as paths:
+        journal = UploadJournal(os.path.join(os.path.dirname(paths[0]), 'journal'))
+        # Files are recorded as they were before the upload, even if they
+        # are deleted once uploaded.
+        st = os.stat(paths[0])
+        results = item.upload(paths[0], journal=journal, delete=True)
+        assert [r.status_code for r in results] == [200]
+        assert not os.path.exists(paths[0])
+        with TempFiles(**{'a.bin': b'a' * 100}) as new_paths:
+            os.utime(new_paths[0], (st.st_atime, st.st_mtime))
+            entry = journal.get('test', 'a.bin', new_paths[0])
+        assert entry['size'] == 100
+        assert entry['md5'] == hashlib.md5(b'a' * 100).hexdigest()
+
+        # Recorded files are skipped.
+        results = item.upload(paths[1], journal=journal)
+        results = item.upload(paths[1], journal=journal)
+        assert results == []
+        assert len(puts(item, 'b.bin')) == 1
+
+        # File-like bodies are uploaded but not journaled.
+        results = item.upload(io.BytesIO(b'c' * 100), key='c.bin', journal=journal)
+        assert [r.status_code for r in results] == [200]
+        assert item.http_session.uploaded['c.bin'] == b'c' * 100
+        journal.close()
+
+
+def test_upload_multipart_retries(monkeypatch):
+    monkeypatch.setattr(internetarchive.item.time, 'sleep', lambda seconds: None)
+    # A failed multipart upload is resumed, only its completion is sent
+    # again rather than a new upload with every part.
+    item = get_item(complete_error=1)
+    with TempFiles(**{'a.bin': b'a' * 100}) as paths:
+        results = item.upload(paths[0], multipart=True, retries=2)
+    assert [r.status_code for r in results] == [200]
+    assert item.http_session.uploaded['a.bin'] == b'a' * 100
+    queries = [(method, query.split('=')[0]) for (method, key, query, headers)
+               in item.http_session.requests]
+    assert queries == [('POST', 'uploads'), ('PUT', 'partNumber'), ('POST', 'uploadId'),
+                       ('GET', 'uploads&prefix'), ('GET', 'uploadId'),
+                       ('POST', 'uploadId')]
+    assert item.http_session.in_progress == {}
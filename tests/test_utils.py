@@ -6,6 +6,70 @@ import internetarchive.utils
 
 def test_utils():
     cg = list(internetarchive.utils.chunk_generator(open('setup.py'), 10))
-    ifp = internetarchive.utils.IterableToFileAdapter([1, 2], 200)
+    ifp = internetarchive.utils.IterableToFileAdapter([b'1', b'2'], 200)
     assert len(ifp) == 200
-    ifp.read()
+    assert ifp.read() == b'12'
+
+
+def test_iterable_to_file_adapter():
+    chunks = [b'abc', b'', b'defgh', b'ij']
+    ifp = internetarchive.utils.IterableToFileAdapter(chunks, 10)
+    assert ifp.read(2) == b'ab'
+    assert ifp.read(4) == b'cdef'
+    buf = bytearray(3)
+    assert ifp.readinto(buf) == 3
+    assert bytes(buf) == b'ghi'
+    assert ifp.read(100) == b'j'
+    assert ifp.read(1) == b''
+
+    ifp = internetarchive.utils.IterableToFileAdapter(chunks, 10)
+    assert ifp.read(3) == b'abc'
+    assert ifp.read() == b'defghij'
+
+
+def test_iter_json_array():
+    data = (b'{"header": {"q": "\\"docs\\": [ {"}, "response": {"numFound": 3, '
+            b'"docs": [{"id": "\xc3\xa9]"}, [1, 2], 345]}, "cursor": "abc"}')
+    received = []
+
+    def chunks(size):
+        for i in range(0, len(data), size):
+            received.append(i)
+            yield data[i:i + size]
+
+    for size in (1, 2, 5, len(data)):
+        envelope = {}
+        docs = internetarchive.utils.iter_json_array(chunks(size), 'docs', envelope)
+        assert next(docs) == {'id': u'\xe9]'}
+        assert envelope == {'header': {'q': '"docs": [ {'},
+                            'response': {'numFound': 3, 'docs': []}}
+        if size < 5:
+            # The rest of the document hasn't been read yet.
+            assert received[-1] < len(data) - 20
+        assert list(docs) == [[1, 2], 345]
+        assert envelope['cursor'] == 'abc'
+
+    envelope = {}
+    assert list(internetarchive.utils.iter_json_array([b'{"error": "x"}'], 'docs',
+                                                      envelope)) == []
+    assert envelope == {'error': 'x'}
+
+
+def test_iter_json_array_numbers():
+    # Numbers split across chunks, e.g. -2500. and 0, or 1e and 5, are
+    # only decoded once they are complete.
+    data = b'{"docs": [1, -2500.0, 1e5, 25, -0.5e-3, true, null], "count": 7}'
+    expected = [1, -2500.0, 1e5, 25, -0.5e-3, True, None]
+    for size in (1, 2, 3, 4, 7):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        envelope = {}
+        docs = internetarchive.utils.iter_json_array(chunks, 'docs', envelope)
+        assert list(docs) == expected
+        assert envelope == {'docs': [], 'count': 7}
+
+    try:
+        list(internetarchive.utils.iter_json_array([b'{"docs": [1, 2'], 'docs'))
+    except ValueError:
+        pass
+    else:
+        assert False, 'expected ValueError'